@@ -28,9 +28,29 @@ def create_app():
         except Exception:
             return value
 
+    from . import db
+    db.init_app(app)
+
+    from . import metrics
+    metrics.init_app(app)
+
+    from . import profiling
+    profiling.init_app(app)
+
+    from . import tracing
+    tracing.init_app(app)
+
+    from .migrations import run_migrations
+    run_migrations()
+
     from .routes import main
     app.register_blueprint(main)
 
+    # Handlers are registered by the modules imported above, so start workers last.
+    from . import jobs
+    if os.getenv("JOB_WORKERS_ENABLED", "1") == "1":
+        jobs.start_workers()
+
     import urllib.parse
 
     def quote_plus_filter(s):
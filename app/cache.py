@@ -0,0 +1,210 @@
+# app/cache.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import metrics
+from app.db import get_connection
+
+# Seconds a cached response stays fresh, per endpoint family.
+# Override any of them with TMDB_CACHE_TTL_<NAME> (e.g. TMDB_CACHE_TTL_SEARCH=3600).
+DEFAULT_TTLS = {
+    "search": 24 * 3600,
+    "credits": 7 * 24 * 3600,
+    "person": 7 * 24 * 3600,
+    "tv": 24 * 3600,
+}
+
+MEMORY_MAX_ENTRIES = int(os.getenv("TMDB_CACHE_MEMORY_ENTRIES", "512"))
+DISK_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+EVICT_EVERY_N_WRITES = 50
+
+MISSING = object()
+
+
+def ttl_for(namespace):
+    override = os.getenv(f"TMDB_CACHE_TTL_{namespace.upper()}")
+    if override:
+        return int(override)
+    return DEFAULT_TTLS.get(namespace, 3600)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for upstream JSON responses: an in-process LRU in front of
+    an SQLite table. Values are stored as JSON text so callers always get a
+    fresh copy they are free to mutate.
+    """
+
+    def __init__(self, memory_entries=MEMORY_MAX_ENTRIES, max_bytes=DISK_MAX_BYTES):
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evicted_rows = 0
+        self.stats = {}
+
+    def _bump(self, namespace, counter):
+        with self._lock:
+            ns = self.stats.setdefault(namespace, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0})
+            ns[counter] += 1
+
+    def _connect(self):
+        return get_connection()
+
+    def _remember(self, cache_key, body, expires_at):
+        with self._lock:
+            self._memory[cache_key] = (body, expires_at)
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, namespace, key):
+        cache_key = f"{namespace}:{key}"
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(cache_key)
+            elif entry:
+                del self._memory[cache_key]
+                entry = None
+        if entry:
+            self._bump(namespace, "memory_hits")
+            return json.loads(entry[0])
+
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, expires_at FROM http_cache WHERE cache_key = ? AND expires_at > ?",
+                (cache_key, now)
+            ).fetchone()
+        except Exception as e:
+            logging.warning(f"Response cache read failed for {cache_key}: {e}")
+            row = None
+
+        if not row:
+            self._bump(namespace, "misses")
+            return MISSING
+
+        body, expires_at = row
+        self._remember(cache_key, body, expires_at)
+        self._bump(namespace, "disk_hits")
+        return json.loads(body)
+
+    def set(self, namespace, key, value, ttl=None):
+        cache_key = f"{namespace}:{key}"
+        body = json.dumps(value)
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else ttl_for(namespace))
+        self._remember(cache_key, body, expires_at)
+        self._bump(namespace, "stores")
+
+        try:
+            conn = self._connect()
+            conn.execute("""
+                INSERT OR REPLACE INTO http_cache (cache_key, namespace, body, size, stored_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (cache_key, namespace, body, len(body), now, expires_at))
+            conn.commit()
+            self._writes += 1
+            if self._writes % EVICT_EVERY_N_WRITES == 0:
+                self._evict(conn, now)
+        except Exception as e:
+            logging.warning(f"Response cache write failed for {cache_key}: {e}")
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then the oldest rows until the table fits in max_bytes."""
+        removed = conn.execute("DELETE FROM http_cache WHERE expires_at <= ?", (now,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        while total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT cache_key, size FROM http_cache ORDER BY stored_at ASC LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany("DELETE FROM http_cache WHERE cache_key = ?", [(k,) for k, _ in rows])
+            total -= sum(size for _, size in rows)
+            removed += len(rows)
+        conn.commit()
+        if removed:
+            with self._lock:
+                self.evicted_rows += removed
+            logging.info(f"Response cache evicted {removed} row(s)")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM http_cache")
+            conn.commit()
+        except Exception as e:
+            logging.warning(f"Response cache clear failed: {e}")
+
+    def summary(self):
+        """Counters plus on-disk footprint, for the admin page."""
+        with self._lock:
+            namespaces = {ns: dict(counters) for ns, counters in self.stats.items()}
+            memory_entries = len(self._memory)
+        for counters in namespaces.values():
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            lookups = hits + counters["misses"]
+            counters["hit_ratio"] = round(hits / lookups, 3) if lookups else None
+
+        disk_entries = disk_bytes = 0
+        try:
+            conn = self._connect()
+            disk_entries, disk_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_cache"
+            ).fetchone()
+        except Exception as e:
+            logging.warning(f"Response cache summary failed: {e}")
+
+        return {
+            "namespaces": namespaces,
+            "memory_entries": memory_entries,
+            "memory_max_entries": self.memory_entries,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+            "disk_max_bytes": self.max_bytes,
+            "evicted_rows": self.evicted_rows,
+        }
+
+
+tmdb_cache = ResponseCache()
+
+
+@metrics.collector
+def _cache_metrics():
+    with tmdb_cache._lock:
+        namespaces = {ns: dict(counters) for ns, counters in tmdb_cache.stats.items()}
+        memory_entries = len(tmdb_cache._memory)
+    lines = [
+        "# HELP shownotes_tmdb_cache_lookups_total TMDB response cache lookups by result.",
+        "# TYPE shownotes_tmdb_cache_lookups_total counter",
+    ]
+    for ns, counters in sorted(namespaces.items()):
+        for result in ("memory_hits", "disk_hits", "misses"):
+            lines.append(f'shownotes_tmdb_cache_lookups_total{{namespace="{ns}",result="{result}"}} {counters[result]}')
+    lines += [
+        "# HELP shownotes_tmdb_cache_hit_ratio Share of TMDB cache lookups served from memory or disk.",
+        "# TYPE shownotes_tmdb_cache_hit_ratio gauge",
+    ]
+    for ns, counters in sorted(namespaces.items()):
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        if lookups:
+            lines.append(f'shownotes_tmdb_cache_hit_ratio{{namespace="{ns}"}} {hits / lookups:.4f}')
+    lines += [
+        "# HELP shownotes_tmdb_cache_memory_entries Entries held in the in-memory LRU tier.",
+        "# TYPE shownotes_tmdb_cache_memory_entries gauge",
+        f"shownotes_tmdb_cache_memory_entries {memory_entries}",
+    ]
+    return lines
@@ -0,0 +1,99 @@
+# app/cast_index.py
+
+import collections
+import logging
+import os
+import threading
+
+
+class CastIndex:
+    """
+    In-memory view of one show's TMDB cast, used to answer character and
+    actor image lookups without touching the network.
+    """
+
+    def __init__(self, show_title, show_id, media_type, cast):
+        self.show_title = show_title
+        self.show_id = show_id
+        self.media_type = media_type
+        self.cast = cast
+        self._entries = [
+            ((actor.get('character') or '').lower(), (actor.get('name') or '').lower(), actor)
+            for actor in cast
+        ]
+        self._lookups = {}
+        self._lookups_lock = threading.Lock()
+
+    def find(self, character):
+        """
+        Same matching rules as the old find_actor_by_name: the first cast entry
+        whose character or actor name contains the query, case-insensitively.
+        """
+        key = (character or '').lower()
+        with self._lookups_lock:
+            if key in self._lookups:
+                return self._lookups[key]
+        match = None
+        for char_lower, name_lower, actor in self._entries:
+            if key in char_lower or key in name_lower:
+                match = actor
+                break
+        with self._lookups_lock:
+            self._lookups[key] = match
+        return match
+
+    def profile_path(self, character):
+        actor = self.find(character)
+        return actor.get('profile_path') if actor else None
+
+    def image_url(self, character, size="w185"):
+        path = self.profile_path(character)
+        return f"https://image.tmdb.org/t/p/{size}{path}" if path else None
+
+
+# At most MAX_ENTRIES shows are kept, least recently used evicted first.
+MAX_ENTRIES = int(os.getenv("CAST_INDEX_ENTRIES", "64"))
+
+_indexes = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def get(show_title, loader):
+    """
+    Return the cached index for show_title, building it with loader() on first use.
+    loader returns (show_id, media_type, cast) or None when the show can't be resolved
+    or its credits can't be fetched; those are not remembered so a later request can
+    try again.
+    """
+    with _lock:
+        index = _indexes.get(show_title)
+        if index is not None:
+            _indexes.move_to_end(show_title)
+            return index
+    loaded = loader(show_title)
+    if not loaded:
+        return CastIndex(show_title, None, None, [])
+    return rebuild(show_title, *loaded)
+
+
+def rebuild(show_title, show_id, media_type, cast):
+    """
+    Replace the cached index for show_title. An empty cast is returned but not
+    kept, so the next request (e.g. /api/show/cast-media) tries TMDB again.
+    """
+    index = CastIndex(show_title, show_id, media_type, cast)
+    if not cast:
+        invalidate(show_title)
+        return index
+    with _lock:
+        _indexes[show_title] = index
+        _indexes.move_to_end(show_title)
+        while len(_indexes) > MAX_ENTRIES:
+            _indexes.popitem(last=False)
+    logging.info(f"Built cast index for {show_title} ({len(cast)} cast members)")
+    return index
+
+
+def invalidate(show_title):
+    with _lock:
+        _indexes.pop(show_title, None)
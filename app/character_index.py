@@ -0,0 +1,111 @@
+# app/character_index.py
+
+import bisect
+import collections
+import logging
+import os
+import threading
+
+from app import page_cache
+from app.db import get_connection
+
+
+def _episode_count(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class CharacterIndex:
+    """
+    Deduplicated character/actor list for one show with sorted prefix arrays,
+    so autocomplete never goes back to SQLite or scans every row.
+    Entries are ordered by episode count, most prominent first.
+    """
+
+    def __init__(self, show_title, rows):
+        self.show_title = show_title
+        self.entries = []
+        seen = set()
+        for character, actor, _ in sorted(rows, key=lambda r: (-_episode_count(r[2]), r[0] or "")):
+            if not character or character.lower() in seen:
+                continue
+            seen.add(character.lower())
+            self.entries.append((character, actor or ""))
+
+        # (key, rank) pairs over the full lowercased names and every word start in them.
+        keys = set()
+        for rank, (character, actor) in enumerate(self.entries):
+            for name in (character.lower(), actor.lower()):
+                words = name.split()
+                for i in range(len(words)):
+                    keys.add((" ".join(words[i:]), rank))
+        self._prefixes = sorted(keys)
+        self._haystacks = [f"{c.lower()}\n{a.lower()}" for c, a in self.entries]
+
+    def search(self, query, limit=10):
+        query = (query or "").strip().lower()
+        if not query:
+            ranks = list(range(len(self.entries)))[:limit]
+        else:
+            matched = set()
+            i = bisect.bisect_left(self._prefixes, (query,))
+            while i < len(self._prefixes) and self._prefixes[i][0].startswith(query):
+                matched.add(self._prefixes[i][1])
+                i += 1
+            ranks = sorted(matched)[:limit]
+            # Mid-word matches only fill whatever room the prefix matches left.
+            if len(ranks) < limit:
+                for rank, haystack in enumerate(self._haystacks):
+                    if rank not in matched and query in haystack:
+                        ranks.append(rank)
+                        if len(ranks) >= limit:
+                            break
+        return [self.entries[rank] for rank in ranks]
+
+
+# Indexes are cached per process, at most MAX_ENTRIES shows, least recently
+# used evicted first. Each remembers the show's page version from SQLite
+# (bumped by every metadata write, see app.page_cache), so an index rebuilt
+# in one worker process is noticed by all the others on their next lookup.
+MAX_ENTRIES = int(os.getenv("CHARACTER_INDEX_ENTRIES", "64"))
+
+_indexes = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def get(show_title):
+    """
+    The character index for a show. Titles with no top_characters rows (e.g. a
+    half-typed show name from autocomplete) get an empty index that is not kept.
+    """
+    show_title = (show_title or "").strip()
+    version = page_cache.version(show_title)
+    with _lock:
+        cached = _indexes.get(show_title)
+        if cached is not None and cached[0] == version:
+            _indexes.move_to_end(show_title)
+            return cached[1]
+    rows = get_connection().execute("""
+        SELECT character_name, actor_name, MAX(episode_count)
+        FROM top_characters
+        WHERE show_title = ?
+        GROUP BY character_name, actor_name
+    """, (show_title,)).fetchall()
+    index = CharacterIndex(show_title, rows)
+    if not rows:
+        invalidate(show_title)
+        return index
+    with _lock:
+        _indexes[show_title] = (version, index)
+        _indexes.move_to_end(show_title)
+        while len(_indexes) > MAX_ENTRIES:
+            _indexes.popitem(last=False)
+    logging.info(f"Built character index for {show_title} ({len(index.entries)} characters)")
+    return index
+
+
+def invalidate(show_title):
+    with _lock:
+        _indexes.pop((show_title or "").strip(), None)
@@ -2,19 +2,120 @@
 
 import sqlite3
 import os
+import threading
+import time
+
+from app import metrics
+from app import tracing
+
+DB_PATH = os.getenv("SHOWNOTES_DB_PATH", os.path.join("data", "shownotes.db"))
+
+# Pragmas applied to every connection handed out by get_connection().
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+_local = threading.local()
+
+
+def _observe(sql, started, rows=None):
+    duration = time.perf_counter() - started
+    metrics.observe_sql(sql, duration)
+    if tracing.active():
+        pattern = tracing.sql_pattern(sql)
+        tracing.record("sql", pattern[:120], started, duration, pattern=pattern, rows=rows)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports statement execution time to app.metrics and app.tracing."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe(sql, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe(sql, started, self.rowcount)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including execute() shortcuts, are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _open_connection():
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, factory=TimedConnection)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # Negative cache_size is in KiB rather than pages.
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA foreign_keys = ON")
+    # INSERT OR REPLACE only fires DELETE triggers with this on; the shows_fts
+    # sync triggers rely on that.
+    conn.execute("PRAGMA recursive_triggers = ON")
+    return conn
+
+
+def get_connection():
+    """
+    Return this thread's SQLite connection, opening it on first use.
+    Callers must not close it; commit (or use `with conn:`) when writing.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
+    return conn
+
+
+def release_connection(exception=None):
+    """
+    Roll back anything a request left uncommitted so the thread's connection
+    never holds the write lock between requests.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def init_app(app):
+    app.teardown_appcontext(release_connection)
 
-DB_PATH = os.path.join("data", "shownotes.db")
 
 def log_overlap_query(show1, show2, result_count):
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection()
         c = conn.cursor()
         c.execute(
             "INSERT INTO overlap_queries (show1, show2, results_count) VALUES (?, ?, ?)",
             (show1, show2, result_count)
         )
         conn.commit()
-        conn.close()
         print(f"✅ Logged overlap query: {show1} vs {show2} ({result_count} matches)")
     except Exception as e:
-        print(f"❌ Failed to log overlap query: {e}")
\ No newline at end of file
+        print(f"❌ Failed to log overlap query: {e}")
@@ -0,0 +1,101 @@
+# app/http_client.py
+
+import logging
+import os
+import random
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app import metrics
+from app import replay
+from app import tracing
+
+# (connect, read) deadlines in seconds for every outbound call.
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+# Upper bound on how long a Retry-After header may make us wait.
+RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "30"))
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Query strings carry credentials (TMDB's api_key); never let one reach a log line.
+_QUERY_STRING = re.compile(r"\?[^\s'\")]*")
+
+
+def redact(text):
+    """Replace every URL query string in text with ?<redacted>."""
+    return _QUERY_STRING.sub("?<redacted>", str(text))
+
+
+class JitteredRetry(Retry):
+    """
+    Exponential backoff with full jitter, and a ceiling on Retry-After.
+    Works on urllib3 1.26 (which has no backoff_jitter) as well as 2.x.
+    """
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, min(backoff, BACKOFF_MAX))
+
+    def parse_retry_after(self, retry_after):
+        return min(super().parse_retry_after(retry_after), RETRY_AFTER_MAX)
+
+
+def build_session():
+    retry = JitteredRetry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    if replay.enabled():
+        adapter = replay.ReplayAdapter(adapter)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": "ShowNotes/1.0"})
+    return session
+
+
+# One pooled, keep-alive session shared by every outbound caller in the app.
+session = build_session()
+
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, upstream="other"):
+    """
+    GET through the shared session. Idempotent, so 429/5xx and connection
+    errors are retried with backoff before the response is handed back.
+    upstream names the service in /metrics (e.g. "tmdb_search", "sonarr").
+    """
+    started = time.perf_counter()
+    with tracing.span("http", upstream, url=url, pattern=tracing.path_pattern(url)) as span:
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            metrics.observe_upstream(upstream, time.perf_counter() - started, "error")
+            # requests/urllib3 messages embed the full URL, query string included.
+            logging.warning(f"Outbound GET {redact(url)} failed: {type(e).__name__}: {redact(e)}")
+            raise
+        span["status"] = response.status_code
+    metrics.observe_upstream(upstream, time.perf_counter() - started, str(response.status_code))
+    return response
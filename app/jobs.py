@@ -0,0 +1,281 @@
+# app/jobs.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app import metrics
+from app.db import get_connection
+
+# Background job queue persisted in the `jobs` table (see app/migrations.py).
+# Jobs with the same dedupe_key collapse into one while queued or running, so
+# every caller asking for the same work waits on the same job.
+
+WORKER_COUNT = int(os.getenv("JOB_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# A job still "running" after this long is assumed orphaned by a dead process.
+STALE_AFTER = int(os.getenv("JOB_STALE_SECONDS", "600"))
+KEEP_FINISHED_FOR = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Jobs queued with a negative priority are background work (e.g. summary
+# warm-up); at most this many of them run at once so they never occupy every
+# worker while a user is waiting.
+BACKGROUND_CONCURRENCY = int(os.getenv("JOB_BACKGROUND_CONCURRENCY", "1"))
+
+HANDLERS = {}
+
+_wakeup = threading.Event()
+_finished = threading.Condition()
+_workers = []
+_running = threading.local()
+_started = False
+_start_lock = threading.Lock()
+
+
+def handler(kind):
+    """Register a function(payload) as the handler for jobs of this kind."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, dedupe_key=None, priority=0, delay=0):
+    """
+    Queue a job and return its id. If a job with the same dedupe_key is already
+    queued or running, return that job's id instead of creating a new one,
+    raising its priority if the new request asked for more.
+    Higher priority runs first; delay holds the job back for that many seconds.
+    """
+    conn = get_connection()
+    now = time.time()
+    try:
+        cursor = conn.execute("""
+            INSERT INTO jobs (kind, dedupe_key, payload, status, priority, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)
+        """, (kind, dedupe_key, json.dumps(payload), priority, now + delay, now, now))
+        conn.commit()
+        job_id = cursor.lastrowid
+        logging.info(f"Queued {kind} job {job_id}")
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        row = conn.execute("""
+            SELECT id FROM jobs
+            WHERE dedupe_key = ? AND status IN ('queued', 'running')
+        """, (dedupe_key,)).fetchone()
+        if not row:
+            # It finished between our insert and this lookup; queue it afresh.
+            return enqueue(kind, payload, dedupe_key, priority, delay)
+        job_id = row[0]
+        conn.execute("""
+            UPDATE jobs SET priority = ?, updated_at = ?
+            WHERE id = ? AND status = 'queued' AND priority < ?
+        """, (priority, now, job_id, priority))
+        conn.commit()
+        logging.info(f"Joined in-flight {kind} job {job_id}")
+    _wakeup.set()
+    return job_id
+
+
+def active_job(dedupe_key):
+    """Id of the queued or running job holding dedupe_key, or None."""
+    row = get_connection().execute("""
+        SELECT id FROM jobs
+        WHERE dedupe_key = ? AND status IN ('queued', 'running')
+    """, (dedupe_key,)).fetchone()
+    return row[0] if row else None
+
+
+def claim(kind, payload, dedupe_key):
+    """
+    Record work the caller is about to do itself (e.g. a streamed summary) as a
+    running job holding dedupe_key, so neither the workers nor another caller
+    start the same work meanwhile. Returns (job_id, True); the caller must
+    finish() it. If the key is already queued or running elsewhere, returns
+    (that job's id, False) and nothing is claimed.
+    Runs in its own IMMEDIATE transaction, so call it with no write open on
+    this thread's connection.
+    """
+    conn = get_connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # The write lock is held from here on, so no other process can take
+        # the key between this check and the insert.
+        row = conn.execute("""
+            SELECT id FROM jobs
+            WHERE dedupe_key = ? AND status IN ('queued', 'running')
+        """, (dedupe_key,)).fetchone()
+        if row:
+            conn.rollback()
+            return row[0], False
+        cursor = conn.execute("""
+            INSERT INTO jobs (kind, dedupe_key, payload, status, priority, attempts, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, 'running', 0, 1, ?, ?, ?)
+        """, (kind, dedupe_key, json.dumps(payload), now, now, now))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logging.info(f"Claimed {kind} job {cursor.lastrowid} for inline work")
+    return cursor.lastrowid, True
+
+
+def current_priority():
+    """Priority of the job the calling worker thread is running, or None outside a job."""
+    return getattr(_running, "priority", None)
+
+
+def get_job(job_id):
+    row = get_connection().execute("""
+        SELECT id, kind, status, payload, result, error, attempts, created_at, updated_at
+        FROM jobs WHERE id = ?
+    """, (job_id,)).fetchone()
+    if not row:
+        return None
+    keys = ("id", "kind", "status", "payload", "result", "error", "attempts", "created_at", "updated_at")
+    job = dict(zip(keys, row))
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else None
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def wait(job_id, timeout=30):
+    """Block until the job is done or failed, or timeout passes. Returns the job."""
+    deadline = time.time() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] in ("done", "failed"):
+            return job
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return job
+        with _finished:
+            _finished.wait(min(remaining, POLL_INTERVAL))
+
+
+def queue_depths():
+    rows = get_connection().execute("""
+        SELECT kind, status, COUNT(*) FROM jobs
+        WHERE status IN ('queued', 'running')
+        GROUP BY kind, status
+    """).fetchall()
+    return {(kind, status): count for kind, status, count in rows}
+
+
+@metrics.collector
+def _queue_metrics():
+    lines = [
+        "# HELP shownotes_job_queue_depth Queued and running background jobs.",
+        "# TYPE shownotes_job_queue_depth gauge",
+    ]
+    for (kind, status), count in sorted(queue_depths().items()):
+        lines.append(f'shownotes_job_queue_depth{{kind="{kind}",status="{status}"}} {count}')
+    return lines
+
+
+def _claim():
+    """Atomically move the next runnable job to 'running'. Returns (id, kind, payload, priority) or None."""
+    conn = get_connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        background_running = conn.execute("""
+            SELECT COUNT(*) FROM jobs WHERE status = 'running' AND priority < 0
+        """).fetchone()[0]
+        min_priority = 0 if background_running >= BACKGROUND_CONCURRENCY else None
+        row = conn.execute("""
+            SELECT id, kind, payload, priority FROM jobs
+            WHERE status = 'queued' AND run_after <= ?
+              AND (? IS NULL OR priority >= ?)
+            ORDER BY priority DESC, id ASC
+            LIMIT 1
+        """, (now, min_priority, min_priority)).fetchone()
+        if row:
+            conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+            """, (now, row[0]))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return row
+
+
+def finish(job_id, status, result=None, error=None):
+    conn = get_connection()
+    conn.execute("""
+        UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?
+        WHERE id = ?
+    """, (status, json.dumps(result) if result is not None else None, error, time.time(), job_id))
+    conn.commit()
+    with _finished:
+        _finished.notify_all()
+
+
+def _run_one():
+    row = _claim()
+    if not row:
+        return False
+    job_id, kind, payload, priority = row
+    func = HANDLERS.get(kind)
+    if func is None:
+        finish(job_id, "failed", error=f"No handler registered for {kind}")
+        return True
+    started = time.time()
+    _running.priority = priority
+    try:
+        result = func(json.loads(payload) if payload else {})
+        finish(job_id, "done", result=result)
+        logging.info(f"{kind} job {job_id} done in {time.time() - started:.1f}s")
+    except Exception as e:
+        logging.exception(f"{kind} job {job_id} failed")
+        finish(job_id, "failed", error=str(e))
+    finally:
+        _running.priority = None
+    return True
+
+
+def _housekeeping():
+    conn = get_connection()
+    now = time.time()
+    conn.execute("""
+        UPDATE jobs SET status = 'queued', updated_at = ?
+        WHERE status = 'running' AND updated_at < ?
+    """, (now, now - STALE_AFTER))
+    conn.execute("""
+        DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?
+    """, (now - KEEP_FINISHED_FOR,))
+    conn.commit()
+
+
+def _worker_loop():
+    while True:
+        try:
+            if _run_one():
+                continue
+        except Exception as e:
+            logging.error(f"Job worker error: {e}")
+        _wakeup.wait(POLL_INTERVAL)
+        _wakeup.clear()
+
+
+def start_workers(count=None):
+    """Start the worker threads once per process."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    try:
+        _housekeeping()
+    except Exception as e:
+        logging.warning(f"Job housekeeping failed: {e}")
+    for i in range(count if count is not None else WORKER_COUNT):
+        worker = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+    logging.info(f"Started {len(_workers)} job worker(s)")
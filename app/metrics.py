@@ -0,0 +1,163 @@
+# app/metrics.py
+
+import bisect
+import logging
+import threading
+import time
+
+from flask import Response, g, request
+
+# In-process counters and histograms exposed at /metrics in the Prometheus
+# text format. Values live per process; scrape every worker process.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SQL_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, *label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        for label_values, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, [("le", bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def collector(func):
+    """Register a function returning exposition lines, called on every scrape."""
+    _collectors.append(func)
+    return func
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for func in _collectors:
+        try:
+            lines.extend(func())
+        except Exception as e:
+            logging.warning(f"Metrics collector {func.__name__} failed: {e}")
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_LATENCY = Histogram(
+    "shownotes_request_duration_seconds",
+    "Time to produce a response, per Flask endpoint.",
+    ("endpoint", "method", "status"),
+)
+UPSTREAM_REQUESTS = Counter(
+    "shownotes_upstream_requests_total",
+    "Outbound calls per upstream and outcome.",
+    ("upstream", "outcome"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "shownotes_upstream_request_duration_seconds",
+    "Outbound call latency per upstream, retries included.",
+    ("upstream",),
+)
+SQL_LATENCY = Histogram(
+    "shownotes_sqlite_query_duration_seconds",
+    "SQLite statement execution time by statement type.",
+    ("statement",),
+    buckets=SQL_BUCKETS,
+)
+SUMMARY_LOOKUPS = Counter(
+    "shownotes_summary_lookups_total",
+    "Character summary page loads by where the summary came from.",
+    ("source",),
+)
+
+
+def observe_upstream(upstream, seconds, outcome):
+    UPSTREAM_REQUESTS.inc(upstream, outcome)
+    UPSTREAM_LATENCY.observe(upstream, value=seconds)
+
+
+def observe_sql(sql, seconds):
+    statement = sql.lstrip().split(None, 1)[0].upper() if sql and sql.strip() else "EMPTY"
+    SQL_LATENCY.observe(statement, value=seconds)
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        # Streamed bodies are timed to the first byte, not to the end of the stream.
+        REQUEST_LATENCY.observe(
+            request.endpoint or "unmatched", request.method, str(response.status_code),
+            value=time.perf_counter() - started,
+        )
+    return response
+
+
+def metrics_view():
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,355 @@
+# app/migrations.py
+
+import logging
+import sqlite3
+
+from app.db import get_connection
+
+
+def _create_shows_fts(conn):
+    """
+    Trigram full-text index over shows.title, kept in sync by triggers.
+    Older SQLite builds without FTS5 or the trigram tokenizer (< 3.34) skip it;
+    search_show_titles() then falls back to a LIKE scan.
+    """
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS shows_fts
+            USING fts5(title, content='shows', content_rowid='id', tokenize='trigram')
+        """)
+    except sqlite3.OperationalError as e:
+        logging.warning(f"FTS5 trigram index unavailable, show autocomplete will scan: {e}")
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS shows_fts_ai AFTER INSERT ON shows BEGIN
+            INSERT INTO shows_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS shows_fts_ad AFTER DELETE ON shows BEGIN
+            INSERT INTO shows_fts (shows_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS shows_fts_au AFTER UPDATE OF title ON shows BEGIN
+            INSERT INTO shows_fts (shows_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO shows_fts (rowid, title) VALUES (new.id, new.title);
+        END
+    """)
+    conn.execute("INSERT INTO shows_fts (shows_fts) VALUES ('rebuild')")
+
+
+# Numbered schema migrations, applied once each and in order at startup.
+# The applied version is tracked in SQLite's PRAGMA user_version.
+# A step is either an SQL statement or a callable taking the connection.
+# Never edit a migration that has shipped; add a new one instead.
+
+MIGRATIONS = [
+    (1, "baseline schema", [
+        """
+        CREATE TABLE IF NOT EXISTS overlap_queries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            show1 TEXT,
+            show2 TEXT,
+            results_count INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS character_summaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            character_name TEXT,
+            show_title TEXT,
+            season_limit INTEGER,
+            episode_limit INTEGER,
+            raw_summary TEXT,
+            parsed_traits TEXT,
+            parsed_events TEXT,
+            parsed_relationships TEXT,
+            parsed_importance TEXT,
+            parsed_quote TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS gpt_chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            input TEXT,
+            response TEXT,
+            context TEXT,
+            type TEXT,
+            user TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS show_metadata (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            show_id INTEGER,
+            show_title TEXT UNIQUE,
+            description TEXT,
+            poster_url TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS season_metadata (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            show_id INTEGER,
+            show_title TEXT,
+            season_number INTEGER,
+            season_description TEXT,
+            season_poster_url TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS top_characters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            show_title TEXT,
+            character_name TEXT,
+            actor_name TEXT,
+            profile_path TEXT,
+            episode_count INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS shows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            show_id INTEGER,
+            title TEXT UNIQUE,
+            overview TEXT,
+            poster_path TEXT,
+            backdrop_path TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seasons (
+            id INTEGER PRIMARY KEY,
+            title TEXT,
+            season_number INTEGER,
+            description TEXT,
+            poster_url TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS api_usage (
+            id INTEGER PRIMARY KEY,
+            character TEXT,
+            show TEXT,
+            season INTEGER,
+            episode INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            total_tokens INTEGER,
+            cost REAL,
+            timestamp TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS current_watch (
+            id INTEGER PRIMARY KEY,
+            show_title TEXT NOT NULL,
+            season INTEGER,
+            episode INTEGER,
+            username TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS webhook_log (
+            id INTEGER PRIMARY KEY,
+            show_title TEXT,
+            season INTEGER,
+            episode INTEGER,
+            username TEXT,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS autocomplete_logs (
+            id INTEGER PRIMARY KEY,
+            term TEXT,
+            type TEXT,
+            timestamp TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS http_cache (
+            cache_key TEXT PRIMARY KEY,
+            namespace TEXT,
+            body TEXT,
+            size INTEGER,
+            stored_at REAL,
+            expires_at REAL
+        )
+        """,
+    ]),
+    (2, "indexes for hot lookups", [
+        # get_cached_summary: equality on the first four columns, newest first.
+        """
+        CREATE INDEX IF NOT EXISTS idx_character_summaries_lookup
+        ON character_summaries (character_name, show_title, season_limit, episode_limit, timestamp)
+        """,
+        # get_top_characters / character autocomplete, covering the selected columns.
+        """
+        CREATE INDEX IF NOT EXISTS idx_top_characters_show
+        ON top_characters (show_title, character_name, actor_name, episode_count)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_current_watch_user
+        ON current_watch (username, updated_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_webhook_log_received
+        ON webhook_log (received_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_api_usage_timestamp
+        ON api_usage (timestamp)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_http_cache_stored
+        ON http_cache (stored_at)
+        """,
+    ]),
+    (3, "trigram title index for show autocomplete", [
+        _create_shows_fts,
+    ]),
+    (4, "background job queue", [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            dedupe_key TEXT,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            priority INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            run_after REAL NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+        # Single-flight: at most one queued/running job per dedupe key.
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_inflight
+        ON jobs (dedupe_key) WHERE status IN ('queued', 'running')
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_runnable
+        ON jobs (status, priority DESC, run_after, id)
+        """,
+    ]),
+    (5, "natural keys for season and cast metadata", [
+        # Keep the newest copy of each duplicated row before adding the keys.
+        """
+        DELETE FROM top_characters WHERE id NOT IN (
+            SELECT MAX(id) FROM top_characters
+            GROUP BY show_title, character_name, actor_name
+        )
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_top_characters_key
+        ON top_characters (show_title, character_name, actor_name)
+        """,
+        """
+        DELETE FROM season_metadata WHERE id NOT IN (
+            SELECT MAX(id) FROM season_metadata
+            GROUP BY show_title, season_number
+        )
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_season_metadata_key
+        ON season_metadata (show_title, season_number)
+        """,
+    ]),
+    (6, "OpenAI call telemetry in api_usage", [
+        "ALTER TABLE api_usage ADD COLUMN model TEXT",
+        "ALTER TABLE api_usage ADD COLUMN prompt_type TEXT",
+        "ALTER TABLE api_usage ADD COLUMN latency_ms REAL",
+        "ALTER TABLE api_usage ADD COLUMN ttft_ms REAL",
+        "ALTER TABLE api_usage ADD COLUMN cache_hit INTEGER NOT NULL DEFAULT 0",
+        # Every row written before this came from the gpt-4 summary prompt.
+        "UPDATE api_usage SET model = 'gpt-4', prompt_type = 'summary' WHERE model IS NULL",
+        """
+        CREATE INDEX IF NOT EXISTS idx_api_usage_model
+        ON api_usage (model, prompt_type, timestamp)
+        """,
+    ]),
+    (7, "Persistent show title to TMDB id resolutions", [
+        """
+        CREATE TABLE IF NOT EXISTS title_resolutions (
+            normalized_title TEXT PRIMARY KEY,
+            query_title TEXT,
+            tmdb_id INTEGER,
+            media_type TEXT,
+            tmdb_title TEXT,
+            poster_path TEXT,
+            backdrop_path TEXT,
+            resolved_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (8, "Precomputed per-show page documents", [
+        """
+        CREATE TABLE IF NOT EXISTS show_pages (
+            show_title TEXT PRIMARY KEY,
+            document TEXT NOT NULL,
+            built_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (9, "Per-show versions for the rendered page cache", [
+        """
+        CREATE TABLE IF NOT EXISTS page_versions (
+            show_title TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+]
+
+
+def current_version(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn=None):
+    """
+    Apply every migration newer than the database's user_version.
+    Each migration runs in its own IMMEDIATE transaction, so two processes
+    starting at once cannot apply the same migration twice.
+    Returns the list of versions applied.
+    """
+    conn = conn or get_connection()
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if current_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another process got here first.
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logging.exception(f"Migration {version} ({description}) failed")
+            raise
+        logging.info(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
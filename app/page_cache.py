@@ -0,0 +1,110 @@
+# app/page_cache.py
+
+import collections
+import hashlib
+import os
+import threading
+
+from flask import Response, g, request
+
+from app import metrics
+from app.db import get_connection
+
+# Rendered-HTML cache for pages that only change when their show's data does
+# (character summaries, show pages). Entries are keyed by endpoint and full
+# path plus the show's page version. invalidate() bumps that version in
+# SQLite, so every worker process stops serving the old HTML at once; stale
+# entries simply age out of the LRU. Responses carry a strong ETag and
+# If-None-Match requests are answered with 304. There is no Last-Modified:
+# HTTP dates have one-second resolution, so a change landing in the same
+# second as the previous render would be answered 304 with stale HTML.
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") == "1"
+MAX_ENTRIES = int(os.getenv("PAGE_CACHE_ENTRIES", "256"))
+
+_entries = collections.OrderedDict()
+_lock = threading.Lock()
+
+PAGE_CACHE_LOOKUPS = metrics.Counter(
+    "shownotes_page_cache_lookups_total",
+    "Rendered page cache lookups by endpoint and result.",
+    ("endpoint", "result"),
+)
+
+
+def version(show_title):
+    """Current version of a show's pages, 0 if they have never changed."""
+    row = get_connection().execute("""
+        SELECT version FROM page_versions WHERE show_title = ?
+    """, (show_title,)).fetchone()
+    return row[0] if row else 0
+
+
+def invalidate(conn, show_title):
+    """Bump a show's page version inside the caller's transaction."""
+    conn.execute("""
+        INSERT INTO page_versions (show_title, version, updated_at)
+        VALUES (?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(show_title) DO UPDATE SET
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """, (show_title,))
+
+
+def _response(body, etag):
+    response = Response(body, mimetype="text/html")
+    response.set_etag(etag)
+    # Browsers may keep the page but must revalidate; an unchanged page costs a 304.
+    response.cache_control.no_cache = True
+    return response
+
+
+def lookup(show_title):
+    """
+    The cached response for this GET (a 304 when the client's copy is current),
+    or None on a miss. After a miss, store() caches what the view renders.
+    """
+    if not PAGE_CACHE_ENABLED or request.method != "GET":
+        return None
+    key = (request.endpoint, request.full_path, version(show_title))
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+    if entry is None:
+        PAGE_CACHE_LOOKUPS.inc(request.endpoint, "miss")
+        g.page_cache_key = key
+        return None
+    response = _response(*entry).make_conditional(request)
+    PAGE_CACHE_LOOKUPS.inc(request.endpoint, "not_modified" if response.status_code == 304 else "hit")
+    return response
+
+
+def store(html):
+    """Cache a page rendered after a lookup() miss and return it as a conditional response."""
+    pending = g.pop("page_cache_key", None)
+    body = html.encode("utf-8")
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    if pending:
+        with _lock:
+            _entries[pending] = (body, etag)
+            _entries.move_to_end(pending)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+    return _response(body, etag).make_conditional(request)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+@metrics.collector
+def _page_cache_metrics():
+    with _lock:
+        entries = len(_entries)
+    return [
+        "# HELP shownotes_page_cache_entries Rendered pages held in memory.",
+        "# TYPE shownotes_page_cache_entries gauge",
+        f"shownotes_page_cache_entries {entries}",
+    ]
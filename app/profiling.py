@@ -0,0 +1,150 @@
+# app/profiling.py
+
+import collections
+import hmac
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+
+from flask import g, request
+
+# Opt-in, per-request sampling profiler. With PROFILING_ENABLED=1 and a
+# PROFILING_TOKEN set, a request carrying ?profile=<token> or an
+# X-Profile-Token header is sampled while it runs. The report is kept in a
+# small in-memory ring buffer for /admin/profiles, and its id comes back in
+# the X-Profile-Id response header.
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+SAMPLE_INTERVAL = float(os.getenv("PROFILING_INTERVAL_MS", "2")) / 1000
+KEEP_PROFILES = int(os.getenv("PROFILING_KEEP", "20"))
+MAX_DEPTH = 128
+
+_profiles = collections.deque(maxlen=KEEP_PROFILES)
+_profiles_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    Samples one thread's stack from a background thread every `interval`
+    seconds and counts identical stacks, root first, in collapsed form.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+
+def requested():
+    """True when profiling is configured and this request carries the admin token."""
+    if not PROFILING_ENABLED or not PROFILING_TOKEN:
+        return False
+    token = request.headers.get("X-Profile-Token") or request.args.get("profile") or ""
+    # compare_digest only takes ASCII str, so compare bytes; a non-ASCII token just mismatches.
+    return hmac.compare_digest(token.encode("utf-8"), PROFILING_TOKEN.encode("utf-8"))
+
+
+def collapsed(profile):
+    """Report in the collapsed-stack format read by flamegraph.pl and speedscope."""
+    return "\n".join(f"{stack} {count}" for stack, count in profile["stacks"].most_common()) + "\n"
+
+
+def top_functions(profile, limit=25):
+    """(function, self samples, total samples) for the busiest frames."""
+    own = collections.Counter()
+    total = collections.Counter()
+    for stack, count in profile["stacks"].items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    return [(frame, own[frame], total[frame]) for frame, _ in total.most_common(limit)]
+
+
+def list_profiles():
+    with _profiles_lock:
+        return list(reversed(_profiles))
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        return next((p for p in _profiles if p["id"] == profile_id), None)
+
+
+def _path_without_token():
+    args = [f"{k}={v}" for k, v in request.args.items(multi=True) if k != "profile"]
+    return request.path + ("?" + "&".join(args) if args else "")
+
+
+def _before_request():
+    if requested():
+        g.profiler = Sampler(threading.get_ident()).start()
+        g.profile_started = time.perf_counter()
+
+
+def _after_request(response):
+    sampler = g.pop("profiler", None)
+    if sampler is None:
+        return response
+    sampler.stop()
+    profile = {
+        "id": next(_ids),
+        "method": request.method,
+        "path": _path_without_token(),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "duration_ms": (time.perf_counter() - g.pop("profile_started")) * 1000,
+        "samples": sampler.samples,
+        "interval_ms": sampler.interval * 1000,
+        "stacks": sampler.stacks,
+        "created_at": time.time(),
+    }
+    with _profiles_lock:
+        _profiles.append(profile)
+    response.headers["X-Profile-Id"] = str(profile["id"])
+    logging.info(f"Profiled {profile['path']}: {profile['duration_ms']:.0f}ms, {profile['samples']} samples")
+    return response
+
+
+def init_app(app):
+    if not PROFILING_ENABLED:
+        return
+    if not PROFILING_TOKEN:
+        logging.warning("PROFILING_ENABLED is set but PROFILING_TOKEN is empty; profiling stays off")
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
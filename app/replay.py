@@ -0,0 +1,226 @@
+# app/replay.py
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+# Record/replay of upstream traffic, for offline runs and benchmarks.
+#
+#   UPSTREAM_REPLAY_MODE=record   call upstreams as usual and archive every response
+#   UPSTREAM_REPLAY_MODE=replay   answer from the archive instead of the network
+#
+# HTTP calls made through http_client's shared session (TMDB, Sonarr) are
+# handled by ReplayAdapter. OpenAI calls are handled by openai_create() and
+# openai_stream() around the SDK. Requests are matched on a fingerprint of
+# method, path, query and body; the host is left out so a recording can be
+# replayed against any base URL, and UPSTREAM_REPLAY_IGNORE_PARAMS (secrets,
+# time windows) are left out too.
+#
+# The archive is gzip-compressed JSON lines, appended to while recording.
+
+MODE = os.getenv("UPSTREAM_REPLAY_MODE", "off")
+ARCHIVE_PATH = os.getenv("UPSTREAM_REPLAY_PATH", os.path.join("data", "upstream.replay.gz"))
+# In replay mode, fail on a request missing from the archive instead of going live.
+STRICT = os.getenv("UPSTREAM_REPLAY_STRICT", "1") == "1"
+# Replayed responses wait for the recorded latency times this factor (0 = instant).
+LATENCY_SCALE = float(os.getenv("UPSTREAM_REPLAY_LATENCY_SCALE", "1.0"))
+IGNORE_PARAMS = {
+    p.strip() for p in os.getenv("UPSTREAM_REPLAY_IGNORE_PARAMS", "api_key,start,end").split(",") if p.strip()
+}
+
+
+class UnrecordedRequest(Exception):
+    """Strict replay was asked for a request that is not in the archive."""
+
+
+def enabled():
+    return MODE in ("record", "replay")
+
+
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+            logging.info(f"Loaded {len(self.entries)} recorded upstream responses from {path}")
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, entry):
+        with self._lock:
+            self.entries[entry["key"]] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Each append adds a gzip member; gzip.open reads them back as one stream.
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = Archive(ARCHIVE_PATH)
+        return _archive
+
+
+def fingerprint(method, url, body=None):
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORE_PARAMS)
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass
+    canonical = json.dumps([method.upper(), parts.path, urlencode(query), body], sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32], f"{method.upper()} {parts.path}?{urlencode(query)}"
+
+
+def _wait(latency_ms):
+    if LATENCY_SCALE > 0 and latency_ms:
+        time.sleep(latency_ms * LATENCY_SCALE / 1000)
+
+
+def _lookup(key, label):
+    entry = archive().get(key)
+    if entry is None and STRICT:
+        logging.error(f"Unrecorded upstream request in strict replay: {label}")
+        raise UnrecordedRequest(label)
+    return entry
+
+
+class ReplayAdapter(BaseAdapter):
+    """requests transport adapter that records or replays what the wrapped adapter sends."""
+
+    def __init__(self, adapter):
+        super().__init__()
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        key, label = fingerprint(request.method, request.url, request.body)
+        if MODE == "replay":
+            entry = _lookup(key, label)
+            if entry is not None:
+                _wait(entry["latency_ms"])
+                return self._build_response(request, entry)
+
+        started = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        if MODE == "record":
+            content = response.content
+            try:
+                body, encoding = content.decode("utf-8"), "utf-8"
+            except UnicodeDecodeError:
+                body, encoding = base64.b64encode(content).decode(), "base64"
+            archive().put({
+                "key": key,
+                "request": label,
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() in ("content-type", "retry-after")},
+                "body": body,
+                "encoding": encoding,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        return response
+
+    @staticmethod
+    def _build_response(request, entry):
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers.update(entry.get("headers") or {})
+        body = entry["body"]
+        response._content = base64.b64decode(body) if entry.get("encoding") == "base64" else body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+def _openai_key(kwargs):
+    return fingerprint("POST", "/chat/completions", json.dumps(kwargs, sort_keys=True, default=str))
+
+
+def openai_create(kwargs, create):
+    """Record or replay a non-streaming chat completion made by create(**kwargs)."""
+    from openai.types.chat import ChatCompletion
+
+    if not enabled():
+        return create(**kwargs)
+    key, label = _openai_key(kwargs)
+    if MODE == "replay":
+        entry = _lookup(key, label)
+        if entry is not None:
+            _wait(entry["latency_ms"])
+            return ChatCompletion.model_validate(entry["response"])
+
+    started = time.perf_counter()
+    response = create(**kwargs)
+    if MODE == "record":
+        archive().put({
+            "key": key,
+            "request": label,
+            "response": response.model_dump(mode="json"),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    return response
+
+
+def openai_stream(kwargs, create):
+    """
+    Record or replay a streamed chat completion, yielding its chunks.
+    Each chunk's arrival offset is kept so replay reproduces time to first token.
+    """
+    from openai.types.chat import ChatCompletionChunk
+
+    if not enabled():
+        yield from create(**kwargs)
+        return
+    key, label = _openai_key(kwargs)
+    if MODE == "replay":
+        entry = _lookup(key, label)
+        if entry is not None:
+            started = time.perf_counter()
+            for offset_ms, chunk in entry["chunks"]:
+                remaining = offset_ms * LATENCY_SCALE / 1000 - (time.perf_counter() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
+                yield ChatCompletionChunk.model_validate(chunk)
+            return
+
+    started = time.perf_counter()
+    chunks = []
+    for chunk in create(**kwargs):
+        chunks.append((round((time.perf_counter() - started) * 1000, 1), chunk.model_dump(mode="json")))
+        yield chunk
+    if MODE == "record":
+        archive().put({
+            "key": key,
+            "request": label,
+            "chunks": chunks,
+            "latency_ms": chunks[-1][0] if chunks else 0,
+        })
@@ -4,13 +4,18 @@
 # /                             → index (dashboard for current watch)
 # /show/<title>/progress/<SxxExx> → detailed show page
 # /character-summary            → summary page for character (GET/POST)
+# /character-summary/stream     → stream a summary being generated (SSE)
+# /jobs/<id>                   → background job status (JSON, polled by pages)
 # /chat-as-character           → chat as character interface
 # /compare                     → compare two shows by overlapping actors
 # /autocomplete/shows          → show autocomplete (AJAX)
 # /autocomplete/characters     → character autocomplete (AJAX)
+# /api/show/cast-media         → character image URLs for a show (JSON, lazy-loaded by pages)
+# /api/show/backdrop           → show backdrop URL (JSON, lazy-loaded by pages)
+# /api/show/characters         → other characters in a show (JSON, lazy-loaded by pages)
 # /plex-webhook                → ingest now-watching webhook from Plex
 # /populate-metadata/<title>   → fetch and save show metadata
-# /admin/init-db               → create necessary tables
+# /admin/init-db               → apply pending schema migrations
 # /admin/summaries/            → view stored character summaries
 # /admin/api-usage             → view OpenAI usage dashboard
 # /admin/test-webhook          → simulate webhook input
@@ -21,43 +26,99 @@
 # /admin/recreate-current-watch → reset now-watching table
 # /admin/autocomplete-log      → view logged autocomplete entries
 # /admin/webhook-log           → view webhook events
+# /admin/cache                 → view TMDB response cache hit/miss counters
+# /metrics                     → Prometheus text-format metrics (registered in app.metrics)
+# /admin/profiles              → sampled request profiles (PROFILING_ENABLED)
+# /admin/traces                → per-request spans of outbound calls and SQL
 # /calendar/full               → return Sonarr calendar events (JSON)
 # /log-autocomplete-selection  → store user autocomplete choice (POST)
 # --------------------------------------------------------------------
 
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context, url_for
 from urllib.parse import unquote_plus, quote_plus
 from markupsafe import Markup
 import os
-import sqlite3
 import traceback
 import logging
 import json
+import hashlib
 from datetime import datetime
 
 from app.utils import (
     get_show_metadata,
     get_season_metadata,
-    get_top_characters,
+    get_show_page,
     get_show_backdrop,
-    get_season_details,
     get_cast,
-    search_tmdb,
-    save_show_metadata,
-    save_season_metadata,
-    save_top_characters,
+    get_actor_details,
+    run_concurrently,
+    resolve_title,
     get_latest_show_title_from_db,
     get_cached_summary,
+    get_nearest_cached_summary,
+    enqueue_summary,
+    summary_in_flight,
     summarize_character,
-    save_character_summary_to_db,
+    stream_character_summary,
     find_actor_by_name,
+    get_cast_index,
     get_all_characters_for_show,
+    search_show_titles,
+    populate_show_metadata,
+    queue_metadata_refresh,
+    queue_summary_warmup,
 )
+from app import character_index
+from app import metrics
+from app import page_cache
+from app import profiling
+from app import tracing
+from app.db import get_connection, DB_PATH
+from app.sonarr_calendar import fetch_sonarr_calendar
 from app.prompt_builder import build_character_prompt, build_quote_prompt, build_relationships_prompt
 
 main = Blueprint('main', __name__)
 logging.basicConfig(level=logging.INFO)
 
+SUMMARY_OPTIONS = {
+    "include_relationships": True,
+    "include_motivations": True,
+    "include_themes": True,
+    "include_quote": True,
+    "tone": "tv_expert"
+}
+
+# When on, a summary cache miss renders the page shell right away and the
+# text streams in over SSE instead of blocking on the whole completion.
+SUMMARY_STREAMING = os.getenv("SUMMARY_STREAMING", "0") == "1"
+
+def wants_streaming():
+    return SUMMARY_STREAMING or request.values.get("stream") == "1"
+
+def load_summary(character, show, season, episode, allow_nearest=True):
+    """
+    Cached summary for this exact progress point if there is one. Otherwise, when
+    allowed, the nearest earlier cached summary plus a background regeneration.
+    Never calls OpenAI on the request thread: a full miss comes back as "pending"
+    and the caller renders render_pending_summary().
+    Returns (summary, raw_summary, source, as_of) where as_of is the (season, episode)
+    a nearest-progress summary was written for.
+    """
+    summary, raw_summary = get_cached_summary(character, show, season, episode)
+    if summary:
+        metrics.SUMMARY_LOOKUPS.inc("cache")
+        return summary, raw_summary, "cache", None
+
+    if allow_nearest:
+        summary, raw_summary, as_of = get_nearest_cached_summary(character, show, season, episode)
+        if summary:
+            enqueue_summary(character, show, season, episode, SUMMARY_OPTIONS)
+            metrics.SUMMARY_LOOKUPS.inc("nearest")
+            return summary, raw_summary, "nearest", as_of
+
+    metrics.SUMMARY_LOOKUPS.inc("pending")
+    return None, None, "pending", None
+
 @main.route('/compare', methods=['POST'])
 def compare():
     title1 = request.form.get('title1')
@@ -67,25 +128,16 @@ def compare():
         logging.warning("Both titles must be provided.")
         return "Both titles must be provided", 400
 
-    res1_tv = search_tmdb(title1, 'tv').get('results', [])
-    res1_mv = search_tmdb(title1, 'movie').get('results', [])
-    result1 = (res1_tv + res1_mv)[0] if (res1_tv + res1_mv) else None
-
-    res2_tv = search_tmdb(title2, 'tv').get('results', [])
-    res2_mv = search_tmdb(title2, 'movie').get('results', [])
-    result2 = (res2_tv + res2_mv)[0] if (res2_tv + res2_mv) else None
+    resolved1, resolved2 = run_concurrently([(resolve_title, title1), (resolve_title, title2)])
 
-    if not result1 or not result2:
+    if not resolved1 or not resolved2:
         logging.warning(f"Could not find one or both titles: {title1}, {title2}")
         return f"Could not find one or both titles: {title1}, {title2}", 404
 
-    id1 = result1['id']
-    id2 = result2['id']
-    type1 = 'tv' if result1 in res1_tv else 'movie'
-    type2 = 'tv' if result2 in res2_tv else 'movie'
+    id1, type1, _ = resolved1
+    id2, type2, _ = resolved2
 
-    cast1 = get_cast(id1, type1)
-    cast2 = get_cast(id2, type2)
+    cast1, cast2 = run_concurrently([(get_cast, id1, type1), (get_cast, id2, type2)])
 
     for actor in cast1:
         actor['show_id'] = id1
@@ -129,51 +181,113 @@ def compare():
 
 @main.route('/autocomplete/shows')
 def autocomplete_shows():
-    query = request.args.get('q', '').lower()
+    query = request.args.get('q', '')
     suggestions = []
     try:
-        db = sqlite3.connect("data/shownotes.db")
-        cursor = db.execute("SELECT DISTINCT title FROM shows")
-        rows = cursor.fetchall()
-        for row in rows:
-            title = row[0]
-            if query in title.lower():
-                suggestions.append({"name": title})
-        db.close()
+        suggestions = [{"name": title} for title in search_show_titles(query, limit=10)]
     except Exception as e:
         logging.error(f"Error fetching shows for autocomplete: {e}")
-    return jsonify(suggestions[:10])
+    response = jsonify(suggestions)
+    # Let the browser reuse results for a prefix it has already asked about.
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
 
 @main.route('/autocomplete/characters')
 def autocomplete_characters():
-    query = request.args.get('q', '').lower()
-    show = request.args.get('show', '')
+    query = request.args.get('q', '')
+    show = request.args.get('show') or request.args.get('context', '')
     suggestions = []
     try:
-        db = sqlite3.connect("data/shownotes.db")
-        cursor = db.execute("""
-            SELECT character_name, actor_name
-            FROM top_characters
-            WHERE show_title = ?
-        """, (show,))
-        rows = cursor.fetchall()
-        seen = set()
-        for character, actor in rows:
-            if (query in character.lower() or query in actor.lower()) and character.lower() not in seen:
-                suggestions.append({"name": f"{character} ({actor})"})
-                seen.add(character.lower())
-        db.close()
+        for character, actor in character_index.get(show).search(query, limit=10):
+            suggestions.append({"name": f"{character} ({actor})"})
     except Exception as e:
         logging.error(f"Error fetching characters for autocomplete: {e}")
-    return jsonify(suggestions[:10])
+    return jsonify(suggestions)
+
+# --------------------------------------------------------------------
+# Lazy-loaded page fragments: pages render with placeholders and fetch
+# these after load, so first paint never waits on TMDB.
+# --------------------------------------------------------------------
+CAST_IMAGE_SIZES = ("w185", "w300")
+# How long browsers may reuse a fragment; empty answers are retried sooner.
+FRAGMENT_MAX_AGE = int(os.getenv("FRAGMENT_MAX_AGE_SECONDS", "86400"))
+CHARACTERS_MAX_AGE = int(os.getenv("CHARACTERS_MAX_AGE_SECONDS", "3600"))
+EMPTY_FRAGMENT_MAX_AGE = 60
+
+def cached_json(payload, max_age):
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+def lazy_fragment_urls(show, character):
+    """Endpoints the character summary page fills its placeholders from."""
+    return {
+        "show_name": show,
+        "character_name": character,
+        "cast_media_url": url_for('main.show_cast_media', show=show, character=character),
+        "characters_url": url_for('main.show_characters', show=show),
+    }
+
+@main.route('/api/show/cast-media')
+def show_cast_media():
+    """
+    Image URLs and actor names for ?show=<title>, for each ?character= given
+    or the show's top characters. Characters the page document already has
+    images for are answered without touching TMDB.
+    """
+    show = request.args.get('show', '').strip()
+    if not show:
+        return jsonify({"error": "show is required"}), 400
+    page = get_show_page(show)
+    names = request.args.getlist('character') or [c for c, _, _ in page["top_characters"]]
+    actors = {c: a for c, a, _ in page["top_characters"]}
+
+    characters = {}
+    show_cast = None
+    for name in names:
+        images = {size: page["actor_images"][size].get(name) for size in CAST_IMAGE_SIZES}
+        actor_name = actors.get(name)
+        if not all(images.values()) or not actor_name:
+            show_cast = show_cast or get_cast_index(show)
+            actor = show_cast.find(name)
+            if actor:
+                actor_name = actor_name or actor.get("name")
+                images = {size: images[size] or show_cast.image_url(name, size) for size in CAST_IMAGE_SIZES}
+        characters[name] = {"actor": actor_name, "images": images}
+
+    found = any(any(entry["images"].values()) for entry in characters.values())
+    return cached_json({"show": show, "characters": characters},
+                       FRAGMENT_MAX_AGE if found else EMPTY_FRAGMENT_MAX_AGE)
+
+@main.route('/api/show/backdrop')
+def show_backdrop():
+    show = request.args.get('show', '').strip()
+    if not show:
+        return jsonify({"error": "show is required"}), 400
+    backdrop_url = get_show_page(show)["backdrop_url"] or get_show_backdrop(show)
+    return cached_json({"show": show, "backdrop_url": backdrop_url},
+                       FRAGMENT_MAX_AGE if backdrop_url else EMPTY_FRAGMENT_MAX_AGE)
+
+@main.route('/api/show/characters')
+def show_characters():
+    show = request.args.get('show', '').strip()
+    if not show:
+        return jsonify({"error": "show is required"}), 400
+    characters = get_all_characters_for_show(show)
+    return cached_json({"show": show, "characters": characters},
+                       CHARACTERS_MAX_AGE if characters else EMPTY_FRAGMENT_MAX_AGE)
 
 @main.route('/character-summary', methods=['GET', 'POST'])
 def character_summary():
-    raw_summary = summary = image_url = reference_links = None
+    raw_summary = summary = reference_links = None
     character = show = ""
     season = episode = 1
     source = None
-    other_characters = []
+    as_of = None
 
     # Handle GET or POST parameters with URL decoding and normalization
     if request.method == 'GET':
@@ -189,43 +303,13 @@ def character_summary():
 
     # Only proceed if show and character are provided
     if show and character:
-        summary, raw_summary = get_cached_summary(character, show, season, episode)
-        source = "cache" if summary else "generated"
-
-        if not summary:
-            options = {
-                "include_relationships": True,
-                "include_motivations": True,
-                "include_themes": True,
-                "include_quote": True,
-                "tone": "tv_expert"
-            }
-            summary, raw_summary = summarize_character(character, show, season, episode, options)
-            save_character_summary_to_db(character, show, season, episode, raw_summary, summary)
-            if summary:
-                from datetime import datetime
-                # Example mock token usage values for demonstration
-                prompt_tokens = 500
-                completion_tokens = 800
-                total_tokens = prompt_tokens + completion_tokens
-                # Approximate GPT-4 Turbo cost calculation
-                cost = (prompt_tokens / 1000 * 0.01) + (completion_tokens / 1000 * 0.03)
-                try:
-                    db = sqlite3.connect("data/shownotes.db")
-                    db.execute("""
-                        INSERT INTO api_usage (character, show, season, episode, prompt_tokens, completion_tokens, total_tokens, cost, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (character, show, season, episode, prompt_tokens, completion_tokens, total_tokens, cost, datetime.utcnow().isoformat()))
-                    db.commit()
-                    db.close()
-                except Exception as log_error:
-                    logging.warning(f"Failed to log API usage: {log_error}")
-
-        actor = find_actor_by_name(show, character)
-        if actor and actor.get("profile_path"):
-            image_url = f"https://image.tmdb.org/t/p/w185{actor['profile_path']}"
-
-        other_characters = get_all_characters_for_show(show)
+        cached_page = page_cache.lookup(show)
+        if cached_page is not None:
+            return cached_page
+        allow_nearest = request.values.get("exact") != "1"
+        summary, raw_summary, source, as_of = load_summary(character, show, season, episode, allow_nearest)
+        if source == "pending":
+            return render_pending_summary(character, show, season, episode)
 
     rendered = render_template("character_summary.html",
                                character=quote_plus(character),
@@ -233,15 +317,92 @@ def character_summary():
                                season=season,
                                episode=episode,
                                summary=summary,
-                               image_url=image_url,
                                raw_summary=raw_summary,
                                source=source,
-                               other_characters=other_characters,
+                               as_of=as_of,
                                reference_links=reference_links,
-                               actor_name=actor["name"] if actor else None)
+                               **(lazy_fragment_urls(show, character) if show and character else {}))
     logging.info(f"Rendering character summary for {character} from {show} S{season}E{episode}")
+    # Only exact summaries are final; a "nearest" page upgrades itself once regenerated.
+    if source == "cache":
+        return page_cache.store(rendered)
     return rendered
 
+def render_pending_summary(character, show, season, episode):
+    """
+    Render the summary page shell immediately for a summary that doesn't exist yet.
+    In streaming mode the text arrives over /character-summary/stream; otherwise a
+    background job generates it and the page polls /jobs/<id> until it is done.
+    """
+    stream_url = job_id = None
+    # A summary already being generated (queued warm-up, another viewer's stream)
+    # is polled rather than streamed a second time.
+    if wants_streaming() and summary_in_flight(character, show, season, episode, SUMMARY_OPTIONS) is None:
+        stream_url = url_for('main.character_summary_stream', character=character, show=show,
+                             season=season, episode=episode)
+    else:
+        job_id = enqueue_summary(character, show, season, episode, SUMMARY_OPTIONS)
+    # Where to go once the summary is saved; never re-submit a POST.
+    done_url = request.url if request.method == 'GET' else url_for(
+        'main.character_summary', character=character, show=show, season=season, episode=episode)
+    return render_template("character_summary.html",
+                           character=quote_plus(character),
+                           show=quote_plus(show),
+                           season=season,
+                           episode=episode,
+                           summary=None,
+                           streaming=bool(stream_url),
+                           stream_url=stream_url,
+                           job_id=job_id,
+                           done_url=done_url,
+                           reference_links=None,
+                           **lazy_fragment_urls(show, character))
+
+@main.route('/character-summary/stream')
+def character_summary_stream():
+    """
+    Server-Sent Events: `token` events carry text fragments, then a single `done`
+    (or `error`) event. The finished summary is parsed and saved before `done`.
+    """
+    character = request.args.get("character", "").strip()
+    show = request.args.get("show", "").strip()
+    season = request.args.get("season", type=int) or 1
+    episode = request.args.get("episode", type=int) or 1
+    if not character or not show:
+        return "character and show are required", 400
+
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def generate():
+        cached, _ = get_cached_summary(character, show, season, episode)
+        if cached:
+            yield sse("done", {"cached": True})
+            return
+        try:
+            for fragment in stream_character_summary(character, show, season, episode, SUMMARY_OPTIONS):
+                yield sse("token", fragment)
+        except Exception as e:
+            logging.error(f"Streaming summary failed for {character} in {show} S{season}E{episode}: {e}")
+            yield sse("error", {"message": "Summary generation failed."})
+            return
+        yield sse("done", {"cached": False})
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@main.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    from app import jobs
+    job = jobs.get_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    response = jsonify({"id": job["id"], "kind": job["kind"], "status": job["status"], "error": job["error"]})
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
 @main.route('/chat-as-character', methods=["GET", "POST"])
 def chat_as_character_view():
     try:
@@ -307,27 +468,7 @@ def plex_webhook():
         logging.info(f"✔️ Webhook: {username} is watching {show_title} S{season}E{episode}")
 
         try:
-            db = sqlite3.connect("data/shownotes.db")
-            db.execute("""
-                CREATE TABLE IF NOT EXISTS current_watch (
-                    id INTEGER PRIMARY KEY,
-                    show_title TEXT NOT NULL,
-                    season INTEGER,
-                    episode INTEGER,
-                    username TEXT,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            db.execute("""
-                CREATE TABLE IF NOT EXISTS webhook_log (
-                    id INTEGER PRIMARY KEY,
-                    show_title TEXT,
-                    season INTEGER,
-                    episode INTEGER,
-                    username TEXT,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            db = get_connection()
             db.execute("""
                 INSERT INTO webhook_log (show_title, season, episode, username)
                 VALUES (?, ?, ?, ?)
@@ -339,9 +480,17 @@ def plex_webhook():
                   AND updated_at >= datetime('now', '-1 minute')
             """, (show_title, int(season), int(episode), username))
 
+            advanced = False
             # Only update current_watch if username == "woodsfehr"
             if username == "woodsfehr":
                 if cursor.fetchone()[0] == 0:
+                    previous = db.execute("""
+                        SELECT show_title, season, episode FROM current_watch
+                        WHERE username = ?
+                        ORDER BY updated_at DESC, id DESC
+                        LIMIT 1
+                    """, (username,)).fetchone()
+                    advanced = previous != (show_title, int(season), int(episode))
                     db.execute("""
                         INSERT INTO current_watch (show_title, season, episode, username)
                         VALUES (?, ?, ?, ?)
@@ -353,24 +502,28 @@ def plex_webhook():
                 logging.info(f"🛑 Ignoring update from non-primary user: {username}")
 
             db.commit()
-            db.close()
         except Exception as db_error:
             logging.error(f"Failed to update current_watch: {db_error}")
             return jsonify({"status": "error", "message": "Database update failed"}), 500
 
-        # Auto-refresh metadata
+        # Metadata refresh happens on a job worker; bursts of events for the same
+        # show collapse into one refresh.
         try:
-            logging.info(f"Starting metadata population for: {show_title}")
-            populate_metadata(show_title)
-            logging.info(f"Metadata populated for: {show_title}")
+            queue_metadata_refresh(show_title)
         except Exception as meta_error:
-            logging.error(f"Error populating metadata for {show_title}: {meta_error}")
-            return jsonify({"status": "error", "message": f"Metadata update failed for {show_title}"}), 500
+            logging.error(f"Failed to queue metadata refresh for {show_title}: {meta_error}")
+
+        # Prepare summaries for the new episode before anyone asks for them.
+        if advanced:
+            try:
+                queue_summary_warmup(show_title, int(season), int(episode), SUMMARY_OPTIONS)
+            except Exception as warmup_error:
+                logging.error(f"Failed to queue summary warm-up for {show_title}: {warmup_error}")
 
         return jsonify({
-            "status": "success",
+            "status": "accepted",
             "message": f"Recorded watch event for {show_title} S{season}E{episode} by {username}"
-        }), 200
+        }), 202
     except Exception as e:
         logging.error(f"Error processing Plex webhook: {e}")
         return jsonify({"status": "error", "message": "Unexpected error processing webhook"}), 500
@@ -383,7 +536,7 @@ def index():
     recent_shows = []
 
     try:
-        db = sqlite3.connect("data/shownotes.db")
+        db = get_connection()
         cursor = db.execute("SELECT show_title, season, episode FROM current_watch WHERE username = 'woodsfehr' ORDER BY updated_at DESC LIMIT 1")
         row = cursor.fetchone()
 
@@ -397,42 +550,23 @@ def index():
                 LIMIT 5
             """)
             recent_shows = [r[0] for r in cursor.fetchall()]
-        db.close()
     except Exception as e:
         logging.error(f"Error reading from database: {e}")
 
-    show_metadata = get_show_metadata(latest_show) if latest_show else None
-    seasons = get_season_metadata(latest_show) if latest_show else []
-    top_characters = get_top_characters(latest_show) if latest_show else []
-    seen = set()
-    unique_characters = []
-    for c in top_characters:
-        key = (c[0], c[1])  # (character, actor)
-        if key not in seen:
-            seen.add(key)
-            unique_characters.append(c)
-    top_characters = unique_characters
-    backdrop_url = get_show_backdrop(latest_show) if latest_show else None
+    # Everything about the show comes from its precomputed page document.
+    page = get_show_page(latest_show) if latest_show else None
+    if page and page["show_metadata"] is None:
+        queue_metadata_refresh(latest_show)
+    show_metadata = page["show_metadata"] if page else None
+    seasons = page["seasons"] if page else []
+    top_characters = page["top_characters"] if page else []
+    backdrop_url = page["backdrop_url"] if page else None
+    actor_images = page["actor_images"]["w185"] if page else {}
     season_banner_path = None
     if latest_show and current_season:
-        try:
-            db = sqlite3.connect("data/shownotes.db")
-            cursor = db.execute("SELECT poster_url FROM seasons WHERE title = ? AND season_number = ?", (latest_show, current_season))
-            row = cursor.fetchone()
-            db.close()
-            if row and row[0]:
-                season_banner_path = row[0]
-            elif show_metadata and len(show_metadata) > 1 and show_metadata[1]:
-                season_banner_path = show_metadata[1]  # fallback to show poster
-        except Exception as e:
-            logging.warning(f"Failed to fetch season banner for {latest_show} S{current_season}: {e}")
-
-    actor_images = {}
-    for character, actor, _ in top_characters[:10]:
-        person = find_actor_by_name(latest_show, character)
-        if person and person.get("profile_path"):
-            image_url = f"https://image.tmdb.org/t/p/w185{person['profile_path']}"
-            actor_images[character] = image_url
+        season_banner_path = dict(page["season_banners"]).get(current_season)
+        if not season_banner_path and show_metadata and len(show_metadata) > 1 and show_metadata[1]:
+            season_banner_path = show_metadata[1]  # fallback to show poster
 
     return render_template(
         "index.html",
@@ -451,11 +585,10 @@ def index():
 
 @main.route('/admin/summaries/')
 def admin_summaries():
-    db_path = os.path.join("data", "shownotes.db")
     summaries = []
 
-    if os.path.exists(db_path):
-        conn = sqlite3.connect(db_path)
+    if os.path.exists(DB_PATH):
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT character_name, show_title, season_limit, episode_limit, timestamp
@@ -464,19 +597,27 @@ def admin_summaries():
             LIMIT 50
         """)
         summaries = cursor.fetchall()
-        conn.close()
 
     return render_template("admin_summaries.html", summaries=summaries)
 
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers, or None when it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
 @main.route('/admin/api-usage')
 def admin_api_usage():
     usage_records = []
     total_calls = 0
     total_cost = 0.0
     cost_per_model = {}
+    usage_breakdown = []
 
     try:
-        db = sqlite3.connect("data/shownotes.db")
+        db = get_connection()
         cursor = db.cursor()
 
         cursor.execute("""
@@ -491,12 +632,42 @@ def admin_api_usage():
         cursor.execute("SELECT COUNT(*), SUM(cost) FROM api_usage")
         total_calls, total_cost = cursor.fetchone()
 
-        # Per-model cost summary (skip if model column not present)
-        # cursor.execute("SELECT model, COUNT(*), SUM(cost) FROM api_usage GROUP BY model")
-        # for model, count, cost in cursor.fetchall():
-        #     cost_per_model[model] = {"count": count, "cost": cost}
+        cursor.execute("SELECT model, COUNT(*), SUM(cost) FROM api_usage GROUP BY model")
+        for model, count, cost in cursor.fetchall():
+            cost_per_model[model or "unknown"] = {"count": count, "cost": cost}
+
+        # Latency percentiles and cost per model and prompt type, last 30 days.
+        groups = {}
+        cursor.execute("""
+            SELECT model, prompt_type, latency_ms, ttft_ms, total_tokens, cost, cache_hit
+            FROM api_usage
+            WHERE timestamp >= datetime('now', '-30 days')
+        """)
+        for model, prompt_type, latency_ms, ttft_ms, tokens, cost, cache_hit in cursor.fetchall():
+            group = groups.setdefault((model or "unknown", prompt_type or "unknown"), {
+                "count": 0, "tokens": 0, "cost": 0.0, "cache_hits": 0, "latencies": [], "ttfts": [],
+            })
+            group["count"] += 1
+            group["tokens"] += tokens or 0
+            group["cost"] += cost or 0
+            group["cache_hits"] += cache_hit or 0
+            if latency_ms is not None:
+                group["latencies"].append(latency_ms)
+            if ttft_ms is not None:
+                group["ttfts"].append(ttft_ms)
+        for (model, prompt_type), group in sorted(groups.items()):
+            usage_breakdown.append({
+                "model": model,
+                "prompt_type": prompt_type,
+                "count": group["count"],
+                "tokens": group["tokens"],
+                "cost": group["cost"],
+                "cache_hits": group["cache_hits"],
+                "p50": percentile(group["latencies"], 50),
+                "p95": percentile(group["latencies"], 95),
+                "ttft_p50": percentile(group["ttfts"], 50),
+            })
 
-        db.close()
     except Exception as e:
         logging.error(f"Error fetching API usage data: {e}")
 
@@ -504,47 +675,17 @@ def admin_api_usage():
                            usage_records=usage_records,
                            total_calls=total_calls,
                            total_cost=total_cost,
-                           cost_per_model=cost_per_model)
+                           cost_per_model=cost_per_model,
+                           usage_breakdown=usage_breakdown)
 
 @main.route('/populate-metadata/<show_title>')
 def populate_metadata(show_title):
     try:
-        logging.info(f"Attempting to fetch metadata for show: {show_title}")
-        results = search_tmdb(show_title, 'tv').get('results', [])
-        logging.info(f"TMDB search found {len(results)} result(s) for {show_title}")
-        if not results:
-            logging.warning(f"No results found for {show_title}.")
+        status = populate_show_metadata(show_title, force=request.args.get("force") == "1")
+        if status == "not_found":
             return f"No results found for {show_title}", 404
-
-        show = results[0]
-        description = show.get('overview', 'No description available.')
-        poster_url = f"https://image.tmdb.org/t/p/w500{show.get('poster_path')}" if show.get('poster_path') else None
-        logging.info(f"Poster URL for {show_title}: {poster_url}")
-        logging.info(f"Selected show: {show}")
-        logging.info(f"Show ID: {show.get('id')}, Description: {description}")
-
-        save_show_metadata(show.get('id'), show_title, description, poster_url)
-        logging.info("Saved show metadata.")
-
-        season_description = "Placeholder description"  # Replace with real data later
-        season_poster_url = None  # Replace with real data later
-        seasons = get_season_details(show.get('id'))
-        logging.info(f"Found {len(seasons)} season(s) for {show_title}")
-        for season_data in seasons:
-            try:
-                season_number = season_data[0]
-                logging.info(f"Processing season {season_number} for {show_title}")
-                season_description = season_data[1] if len(season_data) > 1 else "No description available."
-                season_poster_url = season_data[2] if len(season_data) > 2 else None
-                save_season_metadata(show_title, season_number, season_description, season_poster_url)
-            except Exception as season_error:
-                logging.warning(f"Failed to process season data {season_data}: {season_error}")
-        logging.info("Saved season metadata.")
-
-        character_list = get_cast(show.get('id'), 'tv')
-        save_top_characters(show_title, character_list)
-        logging.info("Saved top characters.")
-
+        if status == "fresh":
+            return f"Metadata for {show_title} is already up to date (add ?force=1 to refetch)", 200
         return f"Metadata saved for {show_title}", 200
     except Exception as e:
         logging.error("Error saving metadata: %s", e)
@@ -555,48 +696,38 @@ def populate_metadata(show_title):
 def show_detail(show_title, season_episode_limit):
     try:
         show_title = unquote_plus(show_title)
-        show_metadata = get_show_metadata(show_title)
+        cached_page = page_cache.lookup(show_title)
+        if cached_page is not None:
+            return cached_page
+        page = get_show_page(show_title)
+        if page["show_metadata"] is None:
+            queue_metadata_refresh(show_title)
+        show_metadata = page["show_metadata"]
         # Fallback for missing or incomplete show_metadata
         if not show_metadata or len(show_metadata) < 3:
             show_metadata = (show_title, None, "No description available.")
-        seasons = get_season_metadata(show_title)
-        # Count episodes per season accurately
+        seasons = page["seasons"]
+        top_characters = page["top_characters"]
+        actor_images = page["actor_images"]["w300"]
+        backdrop_url = page["backdrop_url"]
+
+        # Episode counts, air dates and episode links, for season rows that carry them
         season_counts = {}
-        for row in get_season_metadata(show_title):
+        season_airdates = {}
+        season_episodes = {}
+        for row in seasons:
             if len(row) >= 4:
                 season_num = row[0]
                 season_counts[season_num] = season_counts.get(season_num, 0) + 1
-
-        # Build season_airdates dictionary
-        season_airdates = {}
-        for row in get_season_metadata(show_title):
             if len(row) >= 6:
-                season_num = row[0]
-                air_start = row[4]
-                air_end = row[5]
-                season_airdates[season_num] = (air_start, air_end)
-
-        top_characters = get_top_characters(show_title)
-        # Build actor image dictionary
-        actor_images = {}
-        for character, actor, _ in top_characters:
-            person = find_actor_by_name(show_title, character)
-            if person and person.get("profile_path"):
-                image_url = f"https://image.tmdb.org/t/p/w300{person['profile_path']}"
-                # logging.info(f"Image URL for {character}: {image_url}")
-                actor_images[character] = image_url
-        backdrop_url = get_show_backdrop(show_title)
-
-        # Build a dictionary mapping season numbers to a list of (episode_number, title, episode_url)
-        season_episodes = {}
-        for row in get_season_metadata(show_title):
+                season_airdates[row[0]] = (row[4], row[5])
             if len(row) >= 5:
-                season_num, _, _, ep_num, ep_title = row
+                season_num, _, _, ep_num, ep_title = row[:5]
                 episode_url = f"/{quote_plus(show_title)}/S{season_num:02d}/E{ep_num:02d}"
                 season_episodes.setdefault(season_num, []).append((ep_num, ep_title, episode_url))
 
         logging.info(f"Top characters for {show_title}: {top_characters}")
-        return render_template(
+        rendered = render_template(
             "show.html",
             latest_show=show_title,
             show_metadata=show_metadata,
@@ -609,6 +740,8 @@ def show_detail(show_title, season_episode_limit):
             season_episode_limit=season_episode_limit,
             season_airdates=season_airdates
         )
+        # A show still waiting on its first metadata refresh is not worth keeping.
+        return page_cache.store(rendered) if page["show_metadata"] is not None else rendered
     except Exception as e:
         logging.error(f"Failed to load show page for {show_title}: {e}")
         logging.error(traceback.format_exc())
@@ -668,35 +801,26 @@ def character_summary_clean(show_title, character_name):
         season = 1
         episode = 1
 
-        summary, raw_summary = get_cached_summary(character_name, show_title, season, episode)
-        if not summary:
-            options = {
-                "include_relationships": True,
-                "include_motivations": True,
-                "include_themes": True,
-                "include_quote": True,
-                "tone": "tv_expert"
-            }
-            summary, raw_summary = summarize_character(character_name, show_title, season, episode, options)
-            save_character_summary_to_db(character_name, show_title, season, episode, raw_summary, summary)
+        cached_page = page_cache.lookup(show_title)
+        if cached_page is not None:
+            return cached_page
+        allow_nearest = request.args.get("exact") != "1"
+        summary, raw_summary, source, as_of = load_summary(character_name, show_title, season, episode, allow_nearest)
+        if source == "pending":
+            return render_pending_summary(character_name, show_title, season, episode)
 
-        actor = find_actor_by_name(show_title, character_name)
-        image_url = f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor and actor.get("profile_path") else None
-
-        other_characters = get_all_characters_for_show(show_title)
-
-        return render_template("character_summary.html",
+        rendered = render_template("character_summary.html",
                                character=quote_plus(character_name),
                                show=quote_plus(show_title),
                                season=season,
                                episode=episode,
                                summary=summary,
-                               image_url=image_url,
                                raw_summary=raw_summary,
-                               source="generated",
-                               other_characters=other_characters,
+                               source=source,
+                               as_of=as_of,
                                reference_links=None,
-                               actor_name=actor["name"] if actor else None)
+                               **lazy_fragment_urls(show_title, character_name))
+        return page_cache.store(rendered) if source == "cache" else rendered
     except Exception as e:
         logging.error(f"Failed to load character summary for {character_name} in {show_title}: {e}")
         logging.error(traceback.format_exc())
@@ -712,35 +836,26 @@ def character_summary_with_progress(show_title, character_name, season, episode)
         show_title = unquote_plus(show_title)
         character_name = unquote_plus(character_name)
 
-        summary, raw_summary = get_cached_summary(character_name, show_title, season, episode)
-        if not summary:
-            options = {
-                "include_relationships": True,
-                "include_motivations": True,
-                "include_themes": True,
-                "include_quote": True,
-                "tone": "tv_expert"
-            }
-            summary, raw_summary = summarize_character(character_name, show_title, season, episode, options)
-            save_character_summary_to_db(character_name, show_title, season, episode, raw_summary, summary)
+        cached_page = page_cache.lookup(show_title)
+        if cached_page is not None:
+            return cached_page
+        allow_nearest = request.args.get("exact") != "1"
+        summary, raw_summary, source, as_of = load_summary(character_name, show_title, season, episode, allow_nearest)
+        if source == "pending":
+            return render_pending_summary(character_name, show_title, season, episode)
 
-        actor = find_actor_by_name(show_title, character_name)
-        image_url = f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor and actor.get("profile_path") else None
-
-        other_characters = get_all_characters_for_show(show_title)
-
-        return render_template("character_summary.html",
+        rendered = render_template("character_summary.html",
                                character=quote_plus(character_name),
                                show=quote_plus(show_title),
                                season=season,
                                episode=episode,
                                summary=summary,
-                               image_url=image_url,
                                raw_summary=raw_summary,
-                               source="generated",
-                               other_characters=other_characters,
+                               source=source,
+                               as_of=as_of,
                                reference_links=None,
-                               actor_name=actor["name"] if actor else None)
+                               **lazy_fragment_urls(show_title, character_name))
+        return page_cache.store(rendered) if source == "cache" else rendered
     except Exception as e:
         logging.error(f"Failed to load character summary for {character_name} in {show_title} S{season}E{episode}: {e}")
         logging.error(traceback.format_exc())
@@ -750,7 +865,7 @@ def character_summary_with_progress(show_title, character_name, season, episode)
 def debug_db():
     rows = []
     try:
-        db = sqlite3.connect("data/shownotes.db")
+        db = get_connection()
         cursor = db.execute("""
             SELECT show_title, season, episode, username, updated_at
             FROM current_watch
@@ -758,7 +873,6 @@ def debug_db():
             LIMIT 10
         """)
         rows = cursor.fetchall()
-        db.close()
     except Exception as e:
         logging.error(f"Error fetching debug DB data: {e}")
 
@@ -766,45 +880,15 @@ def debug_db():
 
 @main.route('/admin/init-db')
 def init_db():
+    from app.migrations import run_migrations, current_version
     try:
-        db = sqlite3.connect("data/shownotes.db")
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS api_usage (
-                id INTEGER PRIMARY KEY,
-                character TEXT,
-                show TEXT,
-                season INTEGER,
-                episode INTEGER,
-                prompt_tokens INTEGER,
-                completion_tokens INTEGER,
-                total_tokens INTEGER,
-                cost REAL,
-                timestamp TEXT
-            )
-        """)
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS shows (
-                id INTEGER PRIMARY KEY,
-                tmdb_id INTEGER,
-                title TEXT,
-                description TEXT,
-                poster_url TEXT
-            )
-        """)
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS seasons (
-                id INTEGER PRIMARY KEY,
-                title TEXT,
-                season_number INTEGER,
-                description TEXT,
-                poster_url TEXT
-            )
-        """)
-        db.commit()
-        db.close()
-        return "api_usage, shows, and seasons tables initialized.", 200
+        applied = run_migrations()
+        version = current_version()
+        if applied:
+            return f"Applied migration(s) {', '.join(map(str, applied))}; schema is at version {version}.", 200
+        return f"Schema already up to date at version {version}.", 200
     except Exception as e:
-        logging.error(f"Failed to initialize database tables: {e}")
+        logging.error(f"Failed to run database migrations: {e}")
         return "Database initialization failed.", 500
 
 @main.route("/admin/refresh-show")
@@ -814,7 +898,8 @@ def refresh_show_metadata():
         return "No recent show found.", 400
 
     try:
-        populate_metadata(latest_show)
+        if populate_show_metadata(latest_show, force=True) == "not_found":
+            return f"No results found for {latest_show}", 404
         return f"Metadata refreshed for: {latest_show}", 200
     except Exception as e:
         return f"Error: {e}", 500
@@ -822,21 +907,11 @@ def refresh_show_metadata():
 @main.route('/admin/recreate-current-watch')
 def recreate_current_watch():
     try:
-        db = sqlite3.connect("data/shownotes.db")
-        db.execute("DROP TABLE IF EXISTS current_watch")
-        db.execute("""
-            CREATE TABLE current_watch (
-                id INTEGER PRIMARY KEY,
-                show_title TEXT NOT NULL,
-                season INTEGER,
-                episode INTEGER,
-                username TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        # The schema (and its index) belongs to the migrations; just clear the rows.
+        db = get_connection()
+        db.execute("DELETE FROM current_watch")
         db.commit()
-        db.close()
-        return "current_watch table recreated.", 200
+        return "current_watch table reset.", 200
     except Exception as e:
         return f"Error recreating table: {e}", 500
 
@@ -918,7 +993,7 @@ def test_character_relationships():
 def admin_autocomplete_log():
     logs = []
     try:
-        db = sqlite3.connect("data/shownotes.db")
+        db = get_connection()
         cursor = db.execute("""
             SELECT term, type, timestamp
             FROM autocomplete_logs
@@ -926,7 +1001,6 @@ def admin_autocomplete_log():
             LIMIT 100
         """)
         logs = cursor.fetchall()
-        db.close()
     except Exception as e:
         logging.error(f"Error fetching autocomplete log data: {e}")
     return render_template("admin_autocomplete_log.html", logs=logs)
@@ -935,7 +1009,7 @@ def admin_autocomplete_log():
 def admin_webhook_log():
     logs = []
     try:
-        db = sqlite3.connect("data/shownotes.db")
+        db = get_connection()
         cursor = db.execute("""
             SELECT show_title, season, episode, username, received_at
             FROM webhook_log
@@ -943,11 +1017,68 @@ def admin_webhook_log():
             LIMIT 100
         """)
         logs = cursor.fetchall()
-        db.close()
     except Exception as e:
         logging.error(f"Error fetching webhook log data: {e}")
     return render_template("admin_webhook_log.html", logs=logs)
 
+@main.route('/admin/cache', methods=['GET', 'POST'])
+def admin_cache():
+    from app.cache import tmdb_cache
+    if request.method == 'POST' and request.form.get('action') == 'clear':
+        tmdb_cache.clear()
+        page_cache.clear()
+        logging.info("TMDB response and page caches cleared from admin page")
+    return render_template("admin_cache.html", stats=tmdb_cache.summary())
+
+@main.route('/admin/profiles')
+def admin_profiles():
+    return render_template("admin_profiles.html",
+                           profiles=profiling.list_profiles(),
+                           enabled=profiling.PROFILING_ENABLED and bool(profiling.PROFILING_TOKEN))
+
+@main.route('/admin/profiles/<int:profile_id>')
+def admin_profile_detail(profile_id):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        return "Profile not found (only the most recent profiles are kept)", 404
+    return render_template("admin_profile_detail.html",
+                           profile=profile,
+                           top_functions=profiling.top_functions(profile))
+
+@main.route('/admin/profiles/<int:profile_id>.collapsed')
+def admin_profile_collapsed(profile_id):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        return "Profile not found", 404
+    return Response(profiling.collapsed(profile), mimetype="text/plain",
+                    headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.collapsed"})
+
+@main.route('/admin/traces')
+def admin_traces():
+    traces = [(trace, tracing.summary_header(trace.counts()), len(trace.repeated())) for trace in tracing.list_traces()]
+    return render_template("admin_traces.html", traces=traces, enabled=tracing.TRACING_ENABLED)
+
+@main.route('/admin/traces/<int:trace_id>')
+def admin_trace_detail(trace_id):
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        return "Trace not found (only the most recent traces are kept)", 404
+    # Depth-first order so children sit under the span that issued them.
+    children = {}
+    for span in sorted(trace.spans, key=lambda s: s["start_ms"]):
+        children.setdefault(span["parent"], []).append(span)
+    rows = []
+    stack = [(span, 0) for span in reversed(children.get(None, []))]
+    while stack:
+        span, depth = stack.pop()
+        rows.append((span, depth))
+        stack.extend((child, depth + 1) for child in reversed(children.get(span["id"], [])))
+    return render_template("admin_trace_detail.html",
+                           trace=trace,
+                           rows=rows,
+                           repeated=trace.repeated(),
+                           summary=tracing.summary_header(trace.counts()))
+
 @main.route('/log-autocomplete-selection', methods=['POST'])
 def log_autocomplete_selection():
     data = request.get_json()
@@ -956,21 +1087,12 @@ def log_autocomplete_selection():
     timestamp = datetime.utcnow().isoformat()
 
     try:
-        db = sqlite3.connect("data/shownotes.db")
-        db.execute("""
-            CREATE TABLE IF NOT EXISTS autocomplete_logs (
-                id INTEGER PRIMARY KEY,
-                term TEXT,
-                type TEXT,
-                timestamp TEXT
-            )
-        """)
+        db = get_connection()
         db.execute("""
             INSERT INTO autocomplete_logs (term, type, timestamp)
             VALUES (?, ?, ?)
         """, (term, field_type, timestamp))
         db.commit()
-        db.close()
         return '', 204
     except Exception as e:
         logging.error(f"Failed to log autocomplete selection: {e}")
@@ -1,31 +1,36 @@
-import requests
+import os
+
 from flask import Flask, render_template_string
 from datetime import datetime, timedelta
 
-SONARR_URL = "http://192.168.1.100:8989/api/v3/calendar"
-API_KEY = "your_api_key_here"
+from app import http_client
+
+SONARR_URL = os.getenv("SONARR_URL", "http://192.168.1.100:8989/api/v3/calendar")
+API_KEY = os.getenv("SONARR_API_KEY", "your_api_key_here")
 
-# Query next 7 days of the calendar
-start_date = datetime.now()
-end_date = start_date + timedelta(days=7)
 
-params = {
-    'start': start_date.isoformat(),
-    'end': end_date.isoformat()
-}
+def fetch_sonarr_calendar(days=7):
+    """Episodes airing over the next `days` days, as Sonarr's calendar JSON."""
+    start_date = datetime.now()
+    end_date = start_date + timedelta(days=days)
+    params = {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat()
+    }
+    headers = {
+        'X-Api-Key': API_KEY
+    }
+    response = http_client.get(SONARR_URL, params=params, headers=headers, upstream="sonarr")
+    response.raise_for_status()
+    return response.json()
 
-headers = {
-    'X-Api-Key': API_KEY
-}
 
 app = Flask(__name__)
 
 @app.route('/')
 def show_calendar():
     try:
-        response = requests.get(SONARR_URL, params=params, headers=headers)
-        response.raise_for_status()
-        calendar = response.json()
+        calendar = fetch_sonarr_calendar(days=7)
     except Exception as e:
         return f"<h1>Error fetching calendar: {e}</h1>"
 
@@ -0,0 +1,173 @@
+# app/tracing.py
+
+import collections
+import contextlib
+import contextvars
+import itertools
+import os
+import re
+import threading
+import time
+
+from flask import request
+
+# Lightweight per-request tracing. Every outbound call (TMDB, OpenAI, Sonarr)
+# and SQL statement made while a request is being handled becomes a span.
+# Finished traces go into a ring buffer for /admin/traces, and each response
+# carries an X-Upstream-Calls header summarizing its spans.
+# Code running outside a request (job workers, scripts) records nothing.
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+KEEP_TRACES = int(os.getenv("TRACING_KEEP", "50"))
+# A span name repeated this many times in one request is flagged as a likely N+1.
+REPEAT_WARNING = int(os.getenv("TRACING_REPEAT_WARNING", "5"))
+UNTRACED_ENDPOINTS = {"static", "metrics"}
+
+_current = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("trace_parent", default=None)
+_traces = collections.deque(maxlen=KEEP_TRACES)
+_traces_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+class Trace:
+    def __init__(self, method, path, endpoint):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.status = None
+        self.started = time.perf_counter()
+        self.created_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+        self._span_ids = itertools.count(1)
+
+    def new_span_id(self):
+        return next(self._span_ids)
+
+    def add(self, kind, name, started, duration, parent, span_id=None, **attrs):
+        # list.append is atomic, so spans from pool threads need no lock.
+        self.spans.append({
+            "id": span_id or self.new_span_id(),
+            "parent": parent,
+            "kind": kind,
+            "name": name,
+            "start_ms": (started - self.started) * 1000,
+            "duration_ms": duration * 1000,
+            "thread": threading.current_thread().name,
+            **attrs,
+        })
+
+    def counts(self):
+        """Outbound calls per upstream, plus SQL statements and TMDB cache hits."""
+        counts = collections.Counter()
+        for span in self.spans:
+            if span["kind"] in ("http", "openai"):
+                counts[span["name"]] += 1
+            elif span["kind"] == "sql":
+                counts["sql"] += 1
+            elif span["kind"] == "tmdb" and span.get("cache") == "hit":
+                counts["tmdb_cache_hits"] += 1
+        return counts
+
+    def repeated(self):
+        """(kind, normalized name, count, total ms) for spans repeated REPEAT_WARNING+ times."""
+        groups = {}
+        for span in self.spans:
+            key = (span["kind"], span.get("pattern") or span["name"])
+            count, total = groups.get(key, (0, 0.0))
+            groups[key] = (count + 1, total + span["duration_ms"])
+        return sorted(
+            ((kind, name, count, total) for (kind, name), (count, total) in groups.items() if count >= REPEAT_WARNING),
+            key=lambda row: -row[2],
+        )
+
+
+def active():
+    return _current.get() is not None
+
+
+@contextlib.contextmanager
+def span(kind, name, **attrs):
+    """
+    Time the enclosed block as a span of the current request's trace.
+    Yields a dict the block may add attributes to (e.g. cache status).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    parent = _parent.get()
+    span_id = trace.new_span_id()
+    token = _parent.set(span_id)
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _parent.reset(token)
+        trace.add(kind, name, started, time.perf_counter() - started, parent, span_id, **attrs)
+
+
+def record(kind, name, started, duration, **attrs):
+    """Add an already-timed leaf span (used on the SQL hot path)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(kind, name, started, duration, _parent.get(), **attrs)
+
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBERS = re.compile(r"\b\d+\b")
+
+
+def sql_pattern(sql):
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def path_pattern(path):
+    return _NUMBERS.sub("{id}", path)
+
+
+def summary_header(counts):
+    return ", ".join(f"{name}={count}" for name, count in sorted(counts.items())) or "none"
+
+
+def list_traces():
+    with _traces_lock:
+        return list(reversed(_traces))
+
+
+def get_trace(trace_id):
+    with _traces_lock:
+        return next((t for t in _traces if t.id == trace_id), None)
+
+
+def _before_request():
+    if request.endpoint in UNTRACED_ENDPOINTS:
+        return
+    _current.set(Trace(request.method, request.path, request.endpoint))
+    _parent.set(None)
+
+
+def _after_request(response):
+    trace = _current.get()
+    if trace is None:
+        return response
+    _current.set(None)
+    trace.status = response.status_code
+    trace.duration_ms = (time.perf_counter() - trace.started) * 1000
+    with _traces_lock:
+        _traces.append(trace)
+    response.headers["X-Upstream-Calls"] = summary_header(trace.counts())
+    response.headers["X-Trace-Id"] = str(trace.id)
+    return response
+
+
+def init_app(app):
+    if not TRACING_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -1,23 +1,88 @@
 from dotenv import load_dotenv
 import os
 import requests
-import sqlite3
 import re
 import json
 import logging
+import time
+import unicodedata
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from app.prompt_builder import build_character_prompt
+from app.cache import tmdb_cache, MISSING
+from app import http_client
+from app import cast_index
+from app import character_index
+from app import jobs
+from app import page_cache
+from app import metrics
+from app import replay
+from app import tracing
+from app.db import get_connection
 
 load_dotenv()
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+TMDB_API_BASE = os.getenv("TMDB_API_BASE", "https://api.themoviedb.org/3").rstrip("/")
+# base_url=None lets the SDK fall back to OPENAI_BASE_URL or its default endpoint.
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=os.getenv("OPENAI_BASE_URL") or None,
+    timeout=float(os.getenv("OPENAI_TIMEOUT", "120")),
+    max_retries=http_client.MAX_RETRIES,
+)
+
+# Bounded pool for fanning out independent TMDB lookups within one request.
+TMDB_MAX_WORKERS = int(os.getenv("TMDB_MAX_WORKERS", "8"))
+_tmdb_pool = ThreadPoolExecutor(max_workers=TMDB_MAX_WORKERS, thread_name_prefix="tmdb")
+
+def run_concurrently(calls):
+    """
+    Run a list of (func, *args) tuples on the shared TMDB pool.
+    Results come back in the same order as the calls; the first exception is re-raised.
+    Do not call this from inside a pooled task.
+    Each task runs in a copy of the caller's context, so request tracing follows it.
+    """
+    futures = [_tmdb_pool.submit(contextvars.copy_context().run, func, *args) for func, *args in calls]
+    return [future.result() for future in futures]
+
+def tmdb_cache_key(path, params=None):
+    return json.dumps([path, dict(params or {})], sort_keys=True)
+
+def tmdb_get(path, namespace, params=None, fresh=False):
+    """
+    GET a TMDB endpoint through the response cache.
+    Returns the decoded JSON body, or None when TMDB answers with an error status
+    or cannot be reached after retries. Failures are never cached.
+    fresh=True skips the cache lookup but still stores the new response.
+    """
+    params = dict(params or {})
+    cache_key = tmdb_cache_key(path, params)
+    with tracing.span("tmdb", path, pattern=tracing.path_pattern(path), cache="bypass" if fresh else "miss") as span:
+        if not fresh:
+            cached = tmdb_cache.get(namespace, cache_key)
+            if cached is not MISSING:
+                span["cache"] = "hit"
+                return cached
+
+        try:
+            response = http_client.get(
+                f"{TMDB_API_BASE}/{path}",
+                params={**params, "api_key": TMDB_API_KEY},
+                upstream=f"tmdb_{namespace}",
+            )
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            logging.warning(f"TMDB {path} returned {response.status_code}")
+            return None
+        data = response.json()
+        tmdb_cache.set(namespace, cache_key, data)
+        return data
 
 def search_tmdb(query, media_type='tv'):
-    url = f"https://api.themoviedb.org/3/search/{media_type}"
-    params = {"api_key": TMDB_API_KEY, "query": query}
-    response = requests.get(url, params=params)
-    data = response.json()
+    data = tmdb_get(f"search/{media_type}", "search", {"query": query}) or {}
     if "results" in data:
         for result in data["results"]:
             poster = result.get("poster_path")
@@ -29,30 +94,109 @@ def search_tmdb(query, media_type='tv'):
                 result["poster_path"] = "/" + poster
     return data
 
-def find_actor_by_name(show, character):
-    results_tv = search_tmdb(show, 'tv').get('results', [])
-    results_mv = search_tmdb(show, 'movie').get('results', [])
-    result = (results_tv + results_mv)[0] if (results_tv + results_mv) else None
+# --- Title Resolution ---
+
+# Titles TMDB has no match for are remembered too, but searched again after this long.
+TITLE_MISS_TTL = int(os.getenv("TITLE_RESOLUTION_MISS_TTL_SECONDS", str(24 * 3600)))
+
+_YEAR_SUFFIX = re.compile(r"\s*[\(\[](19|20)\d{2}[\)\]]\s*$")
+
+def strip_year_suffix(title):
+    """Drop a trailing "(2005)"-style year, as Plex appends to remakes."""
+    stripped = _YEAR_SUFFIX.sub("", title or "").strip()
+    return stripped or (title or "").strip()
+
+def normalize_title(title):
+    """
+    Key a title the same way however Plex or a user spelled it: year suffix,
+    accents, punctuation and case are dropped and whitespace is collapsed.
+    """
+    text = unicodedata.normalize("NFKD", strip_year_suffix(title))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower().replace("&", " and ")
+    # "Marvel's" and "S.H.I.E.L.D." close up; other punctuation separates words.
+    text = re.sub(r"['\u2019.]", "", text)
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+def resolve_title(title):
+    """
+    Resolve a show title to (tmdb_id, media_type, result) from the title_resolutions
+    table, searching TMDB (tv first, then movie) only for titles not seen before.
+    result holds the stored search hit's title, poster_path and backdrop_path.
+    Returns None when TMDB has no match.
+    """
+    key = normalize_title(title)
+    if not key:
+        return None
+    row = get_connection().execute("""
+        SELECT tmdb_id, media_type, tmdb_title, poster_path, backdrop_path,
+               (julianday('now') - julianday(resolved_at)) * 86400
+        FROM title_resolutions
+        WHERE normalized_title = ?
+    """, (key,)).fetchone()
+    if row and (row[0] is not None or row[5] < TITLE_MISS_TTL):
+        if row[0] is None:
+            return None
+        return row[0], row[1], {"title": row[2], "poster_path": row[3], "backdrop_path": row[4]}
+
+    query = strip_year_suffix(title)
+    result, media_type = None, None
+    for candidate_type in ('tv', 'movie'):
+        data = search_tmdb(query, candidate_type)
+        if "results" not in data:
+            # TMDB failed or was unreachable; don't remember that as "no match".
+            return None
+        if data["results"]:
+            result, media_type = data["results"][0], candidate_type
+            break
+    stored = {
+        "title": (result or {}).get('name') or (result or {}).get('title'),
+        "poster_path": (result or {}).get('poster_path'),
+        "backdrop_path": (result or {}).get('backdrop_path'),
+    }
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO title_resolutions
+                (normalized_title, query_title, tmdb_id, media_type, tmdb_title, poster_path, backdrop_path, resolved_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (key, title, result['id'] if result else None, media_type,
+              stored["title"], stored["poster_path"], stored["backdrop_path"]))
     if not result:
+        logging.warning(f"No TMDB match for {title!r} (normalized {key!r})")
         return None
-    show_id = result['id']
-    media_type = 'tv' if result in results_tv else 'movie'
-    cast = get_cast(show_id, media_type)
-    character_lower = character.lower()
-    for actor in cast:
-        char_name = actor.get('character') or ''
-        actor_name = actor.get('name') or ''
-        if character_lower in char_name.lower() or character_lower in actor_name.lower():
-            return actor
-    return None
+    logging.info(f"Resolved {title!r} to TMDB {media_type} {result['id']} ({stored['title']})")
+    return result['id'], media_type, stored
 
-def get_cast(media_id, media_type='tv'):
+def _load_show_cast(show):
+    resolved = resolve_title(show)
+    if not resolved:
+        return None
+    show_id, media_type, _ = resolved
+    credits = tmdb_get(_credits_path(show_id, media_type), "credits")
+    if credits is None:
+        return None
+    return show_id, media_type, parse_cast(credits, media_type)
+
+def get_cast_index(show):
+    """
+    Per-show cast index (character/actor name -> person), built once and kept in memory.
+    populate_metadata rebuilds it whenever the show is refreshed.
+    """
+    return cast_index.get(show, _load_show_cast)
+
+def find_actor_by_name(show, character):
+    return get_cast_index(show).find(character)
+
+def _credits_path(media_id, media_type='tv'):
     if media_type == "tv":
-        url = f"https://api.themoviedb.org/3/tv/{media_id}/aggregate_credits"
-    else:
-        url = f"https://api.themoviedb.org/3/movie/{media_id}/credits"
-    response = requests.get(url, params={"api_key": TMDB_API_KEY})
-    data = response.json()
+        return f"tv/{media_id}/aggregate_credits"
+    return f"movie/{media_id}/credits"
+
+def get_cast(media_id, media_type='tv'):
+    return parse_cast(tmdb_get(_credits_path(media_id, media_type), "credits") or {}, media_type)
+
+def parse_cast(data, media_type='tv'):
+    """Flatten a TMDB credits (movie) or aggregate_credits (tv) body into cast dicts."""
     cast = []
     if media_type == "tv":
         for person in data.get("cast", []):
@@ -77,6 +221,16 @@ def get_cast(media_id, media_type='tv'):
 def get_actor_details(cast, show1, show2, top_names=None):
     details = {}
     show_map = {show1[1]: show1[0], show2[1]: show2[0]}
+
+    # Fetch "known for" credits for every distinct actor up front, in parallel.
+    person_ids = []
+    for actor in cast:
+        if top_names and actor.get('name') not in top_names:
+            continue
+        if actor.get('id') and actor['id'] not in person_ids:
+            person_ids.append(actor['id'])
+    known_for_by_id = dict(zip(person_ids, run_concurrently([(get_known_for, pid) for pid in person_ids])))
+
     for actor in cast:
         name = actor.get('name')
         if top_names and name not in top_names:
@@ -91,7 +245,7 @@ def get_actor_details(cast, show1, show2, top_names=None):
             'episode_count': actor.get('episode_count', '')
         }
         if name not in details:
-            known_for = get_known_for(actor_id)
+            known_for = known_for_by_id[actor_id]
             details[name] = {
                 'id': actor_id,
                 'image': f"https://image.tmdb.org/t/p/w185{actor.get('profile_path')}" if actor.get('profile_path') else None,
@@ -104,11 +258,9 @@ def get_actor_details(cast, show1, show2, top_names=None):
     return details
 
 def get_known_for(person_id):
-    url = f"https://api.themoviedb.org/3/person/{person_id}/combined_credits"
-    response = requests.get(url, params={"api_key": TMDB_API_KEY})
-    if response.status_code != 200:
+    data = tmdb_get(f"person/{person_id}/combined_credits", "person")
+    if data is None:
         return []
-    data = response.json()
     credits = data.get('cast', []) + data.get('crew', [])
     seen = set()
     known_for = []
@@ -121,6 +273,69 @@ def get_known_for(person_id):
             break
     return known_for
 
+# --- OpenAI Usage Accounting ---
+
+# USD per 1K (prompt, completion) tokens, matched on the longest model-name
+# prefix so dated snapshots like "gpt-4-0613" price as their family.
+MODEL_PRICING = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+def model_cost(model, prompt_tokens, completion_tokens):
+    matches = [name for name in MODEL_PRICING if (model or "").startswith(name)]
+    if not matches:
+        logging.warning(f"No pricing for model {model}; recording zero cost")
+        return 0.0
+    prompt_rate, completion_rate = MODEL_PRICING[max(matches, key=len)]
+    return round(prompt_tokens / 1000 * prompt_rate + completion_tokens / 1000 * completion_rate, 6)
+
+def record_openai_usage(prompt_type, context, model, usage, latency_ms, ttft_ms=None):
+    """
+    Write one api_usage row from a response's `usage` block.
+    context carries the optional character/show/season/episode the call was for.
+    cache_hit is set when OpenAI served part of the prompt from its prompt cache.
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    total_tokens = getattr(usage, "total_tokens", 0) or prompt_tokens + completion_tokens
+    details = getattr(usage, "prompt_tokens_details", None)
+    cache_hit = bool(getattr(details, "cached_tokens", 0))
+    try:
+        conn = get_connection()
+        conn.execute("""
+            INSERT INTO api_usage (
+                character, show, season, episode, prompt_tokens, completion_tokens, total_tokens,
+                cost, model, prompt_type, latency_ms, ttft_ms, cache_hit, timestamp
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (
+            context.get("character"), context.get("show"), context.get("season"), context.get("episode"),
+            prompt_tokens, completion_tokens, total_tokens,
+            model_cost(model, prompt_tokens, completion_tokens),
+            model, prompt_type, round(latency_ms, 1), round(ttft_ms, 1) if ttft_ms is not None else None,
+            int(cache_hit),
+        ))
+        conn.commit()
+    except Exception as e:
+        logging.error(f"Failed to record OpenAI usage: {e}")
+
+def openai_chat(prompt_type, context, **kwargs):
+    """Non-streaming chat completion that records its usage and latency."""
+    started = time.perf_counter()
+    try:
+        with tracing.span("openai", "openai", prompt_type=prompt_type, model=kwargs.get("model")):
+            response = replay.openai_create(kwargs, client.chat.completions.create)
+    except Exception:
+        metrics.observe_upstream("openai", time.perf_counter() - started, "error")
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000
+    metrics.observe_upstream("openai", latency_ms / 1000, "ok")
+    record_openai_usage(prompt_type, context, response.model or kwargs.get("model"), response.usage, latency_ms)
+    return response
+
 def chat_as_character(character, show_title, user_message):
     prompt = (
         f"You are {character} from the show {show_title}. Reply to the user as that character would — "
@@ -128,7 +343,9 @@ def chat_as_character(character, show_title, user_message):
         f"Do not explain or break the fourth wall. The user says: '{user_message}'"
     )
     try:
-        response = client.chat.completions.create(
+        response = openai_chat(
+            "chat",
+            {"character": character, "show": show_title},
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=300,
@@ -140,7 +357,9 @@ def chat_as_character(character, show_title, user_message):
 
 def get_character_summary(character, show_title, season, episode, options=None):
     prompt = build_character_prompt(character, show_title, season, episode, options)
-    response = client.chat.completions.create(
+    response = openai_chat(
+        "summary",
+        {"character": character, "show": show_title, "season": season, "episode": episode},
         model="gpt-4",
         messages=[{"role": "user", "content": prompt}]
     )
@@ -210,7 +429,7 @@ def parse_character_summary(text):
     return parsed
     
 def save_character_summary_to_db(character, show_title, season, episode, raw_summary, parsed):
-    conn = sqlite3.connect("data/shownotes.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         INSERT INTO character_summaries (
@@ -226,13 +445,13 @@ def save_character_summary_to_db(character, show_title, season, episode, raw_sum
         parsed.get('importance'),
         parsed.get('quote')
     ))
+    page_cache.invalidate(conn, show_title)
     conn.commit()
-    conn.close()
     print(f"Saved summary to DB for {character} in {show_title} S{season}E{episode}")
 
 
 def get_cached_summary(character, show_title, season, episode):
-    conn = sqlite3.connect("data/shownotes.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT parsed_traits, parsed_events, parsed_relationships,
@@ -244,7 +463,6 @@ def get_cached_summary(character, show_title, season, episode):
         LIMIT 1
     ''', (character, show_title, season, episode))
     row = cursor.fetchone()
-    conn.close()
     if row:
         traits, events, relationships_json, importance, quote, raw = row
         return {
@@ -256,6 +474,139 @@ def get_cached_summary(character, show_title, season, episode):
         }, raw
     return None, None
         
+# How far behind the requested progress a cached summary may be and still be
+# served on an exact miss. 0 disables reuse; -1 also allows earlier seasons.
+SUMMARY_REUSE_MAX_BEHIND = int(os.getenv("SUMMARY_REUSE_MAX_BEHIND", "3"))
+
+def get_nearest_cached_summary(character, show_title, season, episode, max_behind=None):
+    """
+    Newest cached summary at or before (season, episode). Anything written for an
+    earlier point in the show cannot spoil later episodes, so it is safe to show
+    while an exact summary is generated.
+    Returns (parsed, raw, (season_limit, episode_limit)) or (None, None, None).
+    """
+    if max_behind is None:
+        max_behind = SUMMARY_REUSE_MAX_BEHIND
+    if max_behind == 0:
+        return None, None, None
+    conn = get_connection()
+    row = conn.execute('''
+        SELECT parsed_traits, parsed_events, parsed_relationships,
+               parsed_importance, parsed_quote, raw_summary,
+               season_limit, episode_limit
+        FROM character_summaries
+        WHERE character_name = ? AND show_title = ?
+          AND (season_limit < ? OR (season_limit = ? AND episode_limit <= ?))
+        ORDER BY season_limit DESC, episode_limit DESC, timestamp DESC
+        LIMIT 1
+    ''', (character, show_title, season, season, episode)).fetchone()
+    if not row:
+        return None, None, None
+    traits, events, relationships_json, importance, quote, raw, season_limit, episode_limit = row
+    # Episode counts per season aren't stored, so distance is only measured within a season.
+    if max_behind > 0 and (season_limit != season or episode - episode_limit > max_behind):
+        return None, None, None
+    return {
+        'traits': traits,
+        'events': events,
+        'relationships': json.loads(relationships_json) if relationships_json else [],
+        'importance': importance,
+        'quote': quote
+    }, raw, (season_limit, episode_limit)
+
+def summary_job_key(character, show_title, season, episode, options=None):
+    return "summary:" + json.dumps([character, show_title, season, episode, options or {}], sort_keys=True)
+
+def summary_job_payload(character, show_title, season, episode, options=None):
+    return {"character": character, "show": show_title, "season": season, "episode": episode, "options": options}
+
+def enqueue_summary(character, show_title, season, episode, options=None, priority=0):
+    """
+    Queue generation of a summary on the background workers and return the job id.
+    Identical requests share one in-flight job.
+    """
+    return jobs.enqueue(
+        "summary",
+        summary_job_payload(character, show_title, season, episode, options),
+        dedupe_key=summary_job_key(character, show_title, season, episode, options),
+        priority=priority,
+    )
+
+def summary_in_flight(character, show_title, season, episode, options=None):
+    """Id of a queued or running job (or stream) generating this summary, or None."""
+    return jobs.active_job(summary_job_key(character, show_title, season, episode, options))
+
+# --- Summary Warm-up ---
+
+# When the watcher moves to a new episode, summaries for the show's top
+# characters are generated ahead of time on low-priority jobs.
+SUMMARY_WARMUP_ENABLED = os.getenv("SUMMARY_WARMUP_ENABLED", "1") == "1"
+SUMMARY_WARMUP_CHARACTERS = int(os.getenv("SUMMARY_WARMUP_CHARACTERS", "5"))
+SUMMARY_WARMUP_PRIORITY = -10
+# Extra wait on top of the metadata refresh window so a new show's cast is in
+# top_characters before the warm-up reads it.
+SUMMARY_WARMUP_DELAY = int(os.getenv("SUMMARY_WARMUP_DELAY", "30"))
+# Warm-up stops queueing once today's (UTC) OpenAI spend in api_usage reaches this.
+SUMMARY_WARMUP_DAILY_BUDGET = float(os.getenv("SUMMARY_WARMUP_DAILY_BUDGET", "1.00"))
+
+def spend_today():
+    row = get_connection().execute("""
+        SELECT COALESCE(SUM(cost), 0) FROM api_usage WHERE timestamp >= date('now')
+    """).fetchone()
+    return row[0]
+
+def queue_summary_warmup(show_title, season, episode, options=None):
+    """
+    Schedule warm-up of the top characters' summaries at this progress point.
+    Pass the same options the summary pages use so their requests join these jobs.
+    """
+    if not SUMMARY_WARMUP_ENABLED:
+        return None
+    return jobs.enqueue(
+        "summary_warmup",
+        {"show": show_title, "season": season, "episode": episode, "options": options},
+        dedupe_key=f"summary_warmup:{show_title}:{season}:{episode}",
+        priority=SUMMARY_WARMUP_PRIORITY,
+        delay=METADATA_REFRESH_COALESCE_SECONDS + SUMMARY_WARMUP_DELAY,
+    )
+
+@jobs.handler("summary_warmup")
+def run_summary_warmup_job(payload):
+    show_title, season, episode = payload["show"], payload["season"], payload["episode"]
+    spent = spend_today()
+    if spent >= SUMMARY_WARMUP_DAILY_BUDGET:
+        logging.info(f"Skipping summary warm-up for {show_title}; ${spent:.2f} spent today")
+        return {"queued": 0, "budget_exhausted": True}
+    queued = 0
+    for character, _, _ in get_top_characters(show_title, limit=SUMMARY_WARMUP_CHARACTERS):
+        cached, _ = get_cached_summary(character, show_title, season, episode)
+        if cached:
+            continue
+        enqueue_summary(character, show_title, season, episode, payload.get("options"),
+                        priority=SUMMARY_WARMUP_PRIORITY)
+        queued += 1
+    logging.info(f"Queued {queued} warm-up summaries for {show_title} S{season}E{episode}")
+    return {"queued": queued, "budget_exhausted": False}
+
+@jobs.handler("summary")
+def run_summary_job(payload):
+    character, show_title = payload["character"], payload["show"]
+    season, episode = payload["season"], payload["episode"]
+    cached, _ = get_cached_summary(character, show_title, season, episode)
+    if cached:
+        return {"cached": True}
+    # Warm-up jobs queued before the cap was hit stop here once it is. A job a
+    # viewer has joined was raised to priority >= 0 and always runs.
+    priority = jobs.current_priority()
+    if priority is not None and priority < 0:
+        spent = spend_today()
+        if spent >= SUMMARY_WARMUP_DAILY_BUDGET:
+            logging.info(f"Skipping warm-up summary for {character} in {show_title}; ${spent:.2f} spent today")
+            return {"cached": False, "budget_exhausted": True}
+    parsed, raw = summarize_character(character, show_title, season, episode, payload.get("options"))
+    save_character_summary_to_db(character, show_title, season, episode, raw, parsed)
+    return {"cached": False}
+
 def summarize_character(character, show_title, season, episode, options=None):
     """
     Generates and parses a character summary based on viewing limits.
@@ -271,34 +622,91 @@ def summarize_character(character, show_title, season, episode, options=None):
     print("[DEBUG] Parsed Importance:", parsed.get("importance"))
     print("[DEBUG] Parsed Quote:", parsed.get("quote"))
 
-    # Estimate token usage (approx. 4 characters per token)
-    tokens = len(raw_summary) // 4
-    model = "gpt-4"
-    cost_per_1k = 0.06  # GPT-4 input cost per 1K tokens
-    cost = round((tokens / 1000) * cost_per_1k, 4)
+    return parsed, raw_summary
 
-    # Log to api_usage table
-    conn = sqlite3.connect("data/shownotes.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO api_usage (character, show, prompt_tokens, completion_tokens, total_tokens, cost, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-    """, (character, show_title, tokens, 0, tokens, cost))
-    conn.commit()
-    conn.close()
+# How long a stream that found its summary already in progress waits for that job.
+SUMMARY_JOIN_TIMEOUT = int(os.getenv("SUMMARY_JOIN_TIMEOUT", "180"))
 
-    return parsed, raw_summary
+def stream_character_summary(character, show_title, season, episode, options=None):
+    """
+    Stream a character summary from OpenAI, yielding text fragments as they arrive.
+    Once the stream completes, the full text is parsed and saved exactly like
+    summarize_character() would. An abandoned stream is not saved.
 
-def get_all_characters_for_show(show_title, limit=10):
-    results_tv = search_tmdb(show_title, 'tv').get('results', [])
-    results_mv = search_tmdb(show_title, 'movie').get('results', [])
-    result = (results_tv + results_mv)[0] if (results_tv + results_mv) else None
+    The stream holds the summary's job dedupe key while it runs, so the queue and
+    other viewers join it instead of paying for a second generation. If the key is
+    already held (a queued job or another stream), this yields nothing and returns
+    once that job is done.
+    """
+    job_id, claimed = jobs.claim(
+        "summary",
+        summary_job_payload(character, show_title, season, episode, options),
+        summary_job_key(character, show_title, season, episode, options),
+    )
+    if not claimed:
+        # Joining also lifts a queued warm-up job to interactive priority.
+        job_id = enqueue_summary(character, show_title, season, episode, options)
+        job = jobs.wait(job_id, timeout=SUMMARY_JOIN_TIMEOUT)
+        if not job or job["status"] != "done":
+            raise RuntimeError(f"Summary job {job_id} did not finish ({job['status'] if job else 'missing'})")
+        return
 
-    if not result:
+    status, error = "failed", "Stream abandoned"
+    try:
+        yield from _stream_and_save_summary(character, show_title, season, episode, options)
+        status, error = "done", None
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        jobs.finish(job_id, status, result={"cached": False, "streamed": True} if status == "done" else None,
+                    error=error)
+
+def _stream_and_save_summary(character, show_title, season, episode, options=None):
+    prompt = build_character_prompt(character, show_title, season, episode, options)
+    started = time.perf_counter()
+    stream = replay.openai_stream(dict(
+        model="gpt-4",
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+        # The final chunk then carries the real token counts.
+        stream_options={"include_usage": True},
+    ), client.chat.completions.create)
+    fragments = []
+    ttft_ms = None
+    usage = None
+    model = "gpt-4"
+    for chunk in stream:
+        model = chunk.model or model
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+            fragments.append(delta)
+            yield delta
+    latency_ms = (time.perf_counter() - started) * 1000
+    metrics.observe_upstream("openai", latency_ms / 1000, "ok")
+
+    raw_summary = "".join(fragments).strip()
+    parsed = parse_character_summary(raw_summary)
+    save_character_summary_to_db(character, show_title, season, episode, raw_summary, parsed)
+    record_openai_usage(
+        "summary",
+        {"character": character, "show": show_title, "season": season, "episode": episode},
+        model, usage, latency_ms, ttft_ms,
+    )
+
+def get_all_characters_for_show(show_title, limit=10):
+    resolved = resolve_title(show_title)
+    if not resolved:
         return []
 
-    media_type = 'tv' if result in results_tv else 'movie'
-    cast = get_cast(result['id'], media_type)
+    tmdb_id, media_type, _ = resolved
+    cast = get_cast(tmdb_id, media_type)
 
     # Sort by episode_count (if available), then name as a fallback
     def sort_key(actor):
@@ -323,8 +731,50 @@ def get_all_characters_for_show(show_title, limit=10):
 
     return characters
 
+def search_show_titles(query, limit=10):
+    """
+    Show titles containing `query`, best matches first: titles starting with it,
+    then titles with a word starting with it, then any other substring match.
+    Uses the shows_fts trigram index when the query is long enough for it.
+    """
+    query = (query or "").strip()
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    prefix, word_start = f"{escaped}%", f"% {escaped}%"
+    conn = get_connection()
+    if len(query) >= 3:
+        try:
+            rows = conn.execute("""
+                SELECT s.title
+                FROM shows_fts
+                JOIN shows s ON s.id = shows_fts.rowid
+                WHERE shows_fts MATCH ?
+                ORDER BY CASE
+                           WHEN s.title LIKE ? ESCAPE '\\' THEN 0
+                           WHEN s.title LIKE ? ESCAPE '\\' THEN 1
+                           ELSE 2
+                         END,
+                         length(s.title), s.title
+                LIMIT ?
+            """, ('"' + query.replace('"', '""') + '"', prefix, word_start, limit)).fetchall()
+            return [row[0] for row in rows]
+        except Exception as e:
+            logging.warning(f"shows_fts lookup failed, falling back to LIKE: {e}")
+    rows = conn.execute("""
+        SELECT title
+        FROM shows
+        WHERE title LIKE ? ESCAPE '\\'
+        ORDER BY CASE
+                   WHEN title LIKE ? ESCAPE '\\' THEN 0
+                   WHEN title LIKE ? ESCAPE '\\' THEN 1
+                   ELSE 2
+                 END,
+                 length(title), title
+        LIMIT ?
+    """, (f"%{escaped}%", prefix, word_start, limit)).fetchall()
+    return [row[0] for row in rows]
+
 def get_latest_show_title_from_db():
-    conn = sqlite3.connect("data/shownotes.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT show_title
@@ -333,17 +783,8 @@ def get_latest_show_title_from_db():
         LIMIT 1
     ''')
     row = cursor.fetchone()
-    conn.close()
     return row[0] if row else None
 
-def get_show_backdrop(show_title):
-    result = search_tmdb(show_title, 'tv').get('results', [])
-    if result:
-        backdrop_path = result[0].get("backdrop_path")
-        if backdrop_path:
-            return f"https://image.tmdb.org/t/p/w780{backdrop_path}"
-    return None
-
 def get_reference_links(show_title, actor_name=None):
     links = []
 
@@ -362,10 +803,8 @@ def get_reference_links(show_title, actor_name=None):
     return links
 
 def get_latest_show_title_from_db():
-    import sqlite3
-    db_path = "data/shownotes.db"
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT show_title
@@ -374,37 +813,28 @@ def get_latest_show_title_from_db():
             LIMIT 1
         """)
         row = cursor.fetchone()
-        conn.close()
         return row[0] if row else None
     except Exception as e:
         print("Error fetching latest show title:", e)
         return None
 
 def get_show_backdrop(title):
-    for media_type in ['tv', 'movie']:
-        search_url = f"https://api.themoviedb.org/3/search/{media_type}"
-        params = {"query": title, "api_key": TMDB_API_KEY}
-        response = requests.get(search_url, params=params)
-        data = response.json()
-        if data.get("results"):
-            backdrop_path = data["results"][0].get("backdrop_path")
-            if backdrop_path:
-                return f"https://image.tmdb.org/t/p/original{backdrop_path}"
+    resolved = resolve_title(title)
+    backdrop_path = resolved[2].get("backdrop_path") if resolved else None
+    if backdrop_path:
+        return f"https://image.tmdb.org/t/p/original{backdrop_path}"
     return None
 
 # --- Show Metadata Utilities ---
 
-def save_show_metadata(show_id, show_title, description, poster_url):
-    """
-    Save show-level metadata to the database.
-    """
+def _write_show_metadata(conn, show_id, show_title, description, poster_url, details):
+    """Write show_metadata, shows and season_metadata rows without committing."""
     # Ensure poster_url is a valid string with a leading slash
     if not poster_url or isinstance(poster_url, int):
         poster_url = "/default.jpg"
     elif isinstance(poster_url, str) and not poster_url.startswith("/"):
         poster_url = "/" + poster_url
 
-    conn = sqlite3.connect("data/shownotes.db")
     cursor = conn.cursor()
     cursor.execute("""
         INSERT OR REPLACE INTO show_metadata (show_id, show_title, description, poster_url)
@@ -412,13 +842,9 @@ def save_show_metadata(show_id, show_title, description, poster_url):
     """, (show_id, show_title, description, poster_url))
     # Also save to the shows table for season lookup
     try:
-        # Attempt to fetch backdrop_path from TMDB details
-        details_url = f"https://api.themoviedb.org/3/tv/{show_id}"
-        details_resp = requests.get(details_url, params={"api_key": TMDB_API_KEY})
         backdrop_path = None
-        if details_resp.status_code == 200:
-            show_data = details_resp.json()
-            backdrop_path = show_data.get("backdrop_path")
+        if details is not None:
+            backdrop_path = details.get("backdrop_path")
             if backdrop_path and not backdrop_path.startswith("/"):
                 backdrop_path = "/" + backdrop_path
 
@@ -435,27 +861,14 @@ def save_show_metadata(show_id, show_title, description, poster_url):
     except Exception as e:
         logging.warning(f"Failed to insert into shows table for {show_title}: {e}")
 
-    # Save season metadata
-    try:
-        seasons = get_season_details(show_id)
-        for season in seasons:
-            season_number, description, poster_url = season
-            cursor.execute("""
-                INSERT OR REPLACE INTO season_metadata (
-                    show_title, season_number, season_description, season_poster_url
-                ) VALUES (?, ?, ?, ?)
-            """, (show_title, season_number, description, poster_url))
-    except Exception as e:
-        logging.warning(f"Failed to insert season metadata for {show_title}: {e}")
-
-    conn.commit()
-    conn.close()
+    if details is not None:
+        _write_seasons(conn, show_id, show_title, parse_seasons(details), prune=True)
 
 def get_show_metadata(show_title):
     """
     Retrieve show metadata by title.
     """
-    conn = sqlite3.connect("data/shownotes.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT show_title, show_id, description
@@ -463,29 +876,43 @@ def get_show_metadata(show_title):
         WHERE show_title = ?
     """, (show_title,))
     row = cursor.fetchone()
-    conn.close()
     return row
 
 # --- Season Metadata Utilities ---
 
-def save_season_metadata(show_title, season_number, season_description, season_poster_url):
+def _write_seasons(conn, show_id, show_title, seasons, prune=False):
     """
-    Save metadata about a specific season of a show.
+    Upsert (season_number, description, poster_url) rows in one executemany.
+    prune=True also deletes the show's seasons missing from the list.
     """
-    conn = sqlite3.connect("data/shownotes.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO season_metadata (show_title, season_number, season_description, season_poster_url)
-        VALUES (?, ?, ?, ?)
-    """, (show_title, season_number, season_description, season_poster_url))
-    conn.commit()
-    conn.close()
+    conn.executemany("""
+        INSERT INTO season_metadata (show_id, show_title, season_number, season_description, season_poster_url)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (show_title, season_number) DO UPDATE SET
+            show_id = COALESCE(excluded.show_id, show_id),
+            season_description = excluded.season_description,
+            season_poster_url = excluded.season_poster_url,
+            timestamp = CURRENT_TIMESTAMP
+    """, [(show_id, show_title, number, description, poster) for number, description, poster in seasons])
+    if prune:
+        _prune_rows(conn, "season_metadata", ("season_number",), show_title,
+                    {(number,) for number, _, _ in seasons})
+
+def _prune_rows(conn, table, key_columns, show_title, keep):
+    """Delete a show's rows in table whose key_columns tuple is not in keep."""
+    columns = ", ".join(key_columns)
+    existing = conn.execute(f"SELECT {columns} FROM {table} WHERE show_title = ?", (show_title,)).fetchall()
+    stale = [key for key in existing if tuple(key) not in keep]
+    if stale:
+        where = " AND ".join(f"{column} = ?" for column in key_columns)
+        conn.executemany(f"DELETE FROM {table} WHERE show_title = ? AND {where}",
+                         [(show_title, *key) for key in stale])
 
 def get_season_metadata(show_title):
     """
     Retrieve metadata for all seasons of a given show.
     """
-    conn = sqlite3.connect("data/shownotes.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT season_number, season_description, season_poster_url
@@ -494,36 +921,51 @@ def get_season_metadata(show_title):
         ORDER BY season_number ASC
     """, (show_title,))
     seasons = cursor.fetchall()
-    conn.close()
     return seasons
 
 # --- Top Characters Utilities ---
 
-def save_top_characters(show_title, character_list):
+def _write_top_characters(conn, show_title, character_list, prune=False):
     """
-    Save top characters for a show. Expects a list of tuples: (character_name, actor_name, episode_count).
+    Upsert cast rows in one executemany, keyed on (show, character, actor).
+    prune=True also deletes the show's rows missing from character_list.
     """
-    conn = sqlite3.connect("data/shownotes.db")
-    cursor = conn.cursor()
+    rows = {}
     for character in character_list:
         if len(character) >= 3:
             name = character.get("character", "")
             actor = character.get("name", "")
-            count = character.get("episode_count", 0)
-            cursor.execute("""
-                INSERT OR REPLACE INTO top_characters (show_title, character_name, actor_name, episode_count)
-                VALUES (?, ?, ?, ?)
-            """, (show_title, name, actor, count))
+            # aggregate_credits can list the same pairing twice; keep the larger count.
+            previous = rows.get((name, actor))
+            if previous is None or _episode_count(character) > _episode_count(previous):
+                rows[(name, actor)] = character
         else:
             logging.warning(f"Skipping character entry due to unexpected format: {character}")
-    conn.commit()
-    conn.close()
+    conn.executemany("""
+        INSERT INTO top_characters (show_title, character_name, actor_name, profile_path, episode_count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (show_title, character_name, actor_name) DO UPDATE SET
+            profile_path = excluded.profile_path,
+            episode_count = excluded.episode_count,
+            timestamp = CURRENT_TIMESTAMP
+    """, [
+        (show_title, name, actor, character.get("profile_path"), character.get("episode_count", 0))
+        for (name, actor), character in rows.items()
+    ])
+    if prune:
+        _prune_rows(conn, "top_characters", ("character_name", "actor_name"), show_title, set(rows))
+
+def _episode_count(character):
+    try:
+        return int(character.get("episode_count") or 0)
+    except (TypeError, ValueError):
+        return 0
 
 def get_top_characters(show_title, limit=10):
     """
     Retrieve the top characters for a show, sorted by episode count.
     """
-    conn = sqlite3.connect("data/shownotes.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT character_name, actor_name, MAX(episode_count) as max_count
@@ -534,20 +976,98 @@ def get_top_characters(show_title, limit=10):
         LIMIT ?
     """, (show_title, limit))
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
-def get_season_details(show_id):
+# --- Show Page Documents ---
+
+# The dashboard and show page render from one precomputed document per show,
+# rebuilt from the database in the same transaction as every metadata write.
+
+def build_show_page(conn, show_title):
     """
-    Fetch metadata for all seasons of a given show from TMDB.
+    Assemble a show's page document from stored rows only (no TMDB calls):
+    show info, seasons, deduplicated top cast with image URLs and the backdrop.
     """
-    url = f"https://api.themoviedb.org/3/tv/{show_id}"
-    response = requests.get(url, params={"api_key": TMDB_API_KEY})
-    if response.status_code != 200:
-        logging.error(f"Failed to fetch show metadata for show_id {show_id}")
-        return []
+    show_metadata = conn.execute("""
+        SELECT show_title, show_id, description
+        FROM show_metadata
+        WHERE show_title = ?
+    """, (show_title,)).fetchone()
+    seasons = conn.execute("""
+        SELECT season_number, season_description, season_poster_url
+        FROM season_metadata
+        WHERE show_title = ?
+        ORDER BY season_number ASC
+    """, (show_title,)).fetchall()
+    cast_rows = conn.execute("""
+        SELECT character_name, actor_name, MAX(episode_count) as max_count, MAX(profile_path)
+        FROM top_characters
+        WHERE show_title = ?
+        GROUP BY character_name, actor_name
+        ORDER BY max_count DESC
+        LIMIT 10
+    """, (show_title,)).fetchall()
+    season_banners = conn.execute(
+        "SELECT season_number, poster_url FROM seasons WHERE title = ? AND poster_url IS NOT NULL",
+        (show_title,),
+    ).fetchall()
+
+    backdrop_path = None
+    row = conn.execute("SELECT backdrop_path FROM shows WHERE title = ?", (show_title,)).fetchone()
+    if row and row[0]:
+        backdrop_path = row[0]
+    else:
+        row = conn.execute(
+            "SELECT backdrop_path FROM title_resolutions WHERE normalized_title = ?",
+            (normalize_title(show_title),),
+        ).fetchone()
+        backdrop_path = row[0] if row else None
+
+    top_characters = []
+    actor_images = {"w185": {}, "w300": {}}
+    for character, actor, count, profile_path in cast_rows:
+        top_characters.append([character, actor, count])
+        if profile_path:
+            for size, images in actor_images.items():
+                images[character] = f"https://image.tmdb.org/t/p/{size}{profile_path}"
+
+    return {
+        "show_title": show_title,
+        "show_metadata": list(show_metadata) if show_metadata else None,
+        "seasons": [list(season) for season in seasons],
+        "top_characters": top_characters,
+        "actor_images": actor_images,
+        "backdrop_url": f"https://image.tmdb.org/t/p/original{backdrop_path}" if backdrop_path else None,
+        "season_banners": [list(banner) for banner in season_banners],
+    }
+
+def _write_show_page(conn, show_title):
+    """Rebuild and store a show's page document without committing."""
+    document = build_show_page(conn, show_title)
+    conn.execute("""
+        INSERT OR REPLACE INTO show_pages (show_title, document, built_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+    """, (show_title, json.dumps(document)))
+    page_cache.invalidate(conn, show_title)
+    return document
 
-    data = response.json()
+def get_show_page(show_title):
+    """
+    A show's page document in one keyed read. Shows stored before documents
+    existed get theirs built from the database on first use; shows with no
+    metadata at all get an unsaved, mostly empty document.
+    """
+    conn = get_connection()
+    row = conn.execute("SELECT document FROM show_pages WHERE show_title = ?", (show_title,)).fetchone()
+    if row:
+        return json.loads(row[0])
+    document = build_show_page(conn, show_title)
+    if document["show_metadata"] is None:
+        return document
+    with conn:
+        return _write_show_page(conn, show_title)
+
+def parse_seasons(data):
     seasons = data.get("seasons", [])
     return [
         (
@@ -557,4 +1077,92 @@ def get_season_details(show_id):
         )
         for s in seasons
         if s.get("season_number") != 0  # Skip specials
-    ]
\ No newline at end of file
+    ]
+
+# --- Metadata Refresh ---
+
+# Webhook-triggered refreshes wait this long so a burst of play/pause/scrobble
+# events for one show becomes a single refresh.
+METADATA_REFRESH_COALESCE_SECONDS = int(os.getenv("METADATA_REFRESH_COALESCE_SECONDS", "60"))
+# Stored metadata younger than this is considered fresh and not fetched again
+# unless the refresh is forced.
+METADATA_TTL = int(os.getenv("METADATA_TTL_SECONDS", str(6 * 3600)))
+
+def fetch_show_details(show_id, fresh=False):
+    """
+    Fetch a show's details, seasons and aggregate credits in one TMDB request.
+    The credits are also stored under the key get_cast() uses, so later cast
+    lookups for this show are cache hits.
+    """
+    data = tmdb_get(f"tv/{show_id}", "tv", {"append_to_response": "aggregate_credits"}, fresh=fresh)
+    if data is None:
+        logging.error(f"Failed to fetch show details for show_id {show_id}")
+        return None
+    if "aggregate_credits" in data:
+        tmdb_cache.set("credits", tmdb_cache_key(_credits_path(show_id)), data["aggregate_credits"])
+    return data
+
+def populate_show_metadata(show_title, force=False):
+    """
+    Refresh a show's metadata, seasons and cast from TMDB in a single request
+    and store them in one transaction.
+    Returns "refreshed", "fresh" (stored data is within METADATA_TTL and
+    force is off) or "not_found".
+    """
+    age = seconds_since_metadata_refresh(show_title)
+    if not force and age is not None and age < METADATA_TTL:
+        logging.info(f"Metadata for {show_title} is {int(age)}s old; skipping refresh")
+        return "fresh"
+
+    # A show we've stored before keeps its TMDB id, so only new shows need a search.
+    stored = get_show_metadata(show_title)
+    show_id = stored[1] if stored and stored[1] else None
+    if show_id is None:
+        resolved = resolve_title(show_title)
+        if not resolved or resolved[1] != 'tv':
+            logging.warning(f"No TMDB tv match for {show_title}.")
+            return "not_found"
+        show_id = resolved[0]
+
+    details = fetch_show_details(show_id, fresh=True)
+    if details is None:
+        raise RuntimeError(f"TMDB details request failed for {show_title}")
+
+    description = details.get('overview') or 'No description available.'
+    poster_url = f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}" if details.get('poster_path') else None
+    character_list = parse_cast(details.get('aggregate_credits') or {}, 'tv')
+
+    conn = get_connection()
+    with conn:
+        _write_show_metadata(conn, show_id, show_title, description, poster_url, details)
+        _write_top_characters(conn, show_title, character_list, prune=True)
+        _write_show_page(conn, show_title)
+    logging.info(f"Refreshed {show_title}: {len(parse_seasons(details))} season(s), {len(character_list)} cast")
+
+    cast_index.rebuild(show_title, show_id, 'tv', character_list)
+    character_index.invalidate(show_title)
+    return "refreshed"
+
+def seconds_since_metadata_refresh(show_title):
+    row = get_connection().execute("""
+        SELECT (julianday('now') - julianday(timestamp)) * 86400
+        FROM show_metadata
+        WHERE show_title = ?
+    """, (show_title,)).fetchone()
+    return row[0] if row and row[0] is not None else None
+
+def queue_metadata_refresh(show_title):
+    """
+    Queue a coalesced background refresh for a show. Events arriving while one is
+    already queued join it instead of adding another.
+    """
+    return jobs.enqueue(
+        "refresh_metadata",
+        {"show": show_title},
+        dedupe_key=f"refresh_metadata:{show_title}",
+        delay=METADATA_REFRESH_COALESCE_SECONDS,
+    )
+
+@jobs.handler("refresh_metadata")
+def run_metadata_refresh_job(payload):
+    return {"status": populate_show_metadata(payload["show"])}
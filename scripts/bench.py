@@ -0,0 +1,366 @@
+"""
+Benchmark the main routes against local stand-ins for TMDB, OpenAI and Sonarr.
+
+    python scripts/bench.py --requests 200 --concurrency 4 --tmdb-latency-ms 40 \
+        --output bench-results/baseline.json
+
+Each stub is a small threaded HTTP server with a fixed per-request latency and
+deterministic canned payloads. The app runs in-process against a throwaway
+SQLite database and is driven through Flask's test client. For every scenario
+the report gives throughput, p50/p95/p99 latency and the average outbound
+calls per request (read from the X-Upstream-Calls header). stub_hits counts
+every request each stub received during the scenario, including ones made by
+background jobs. Results are saved as JSON so two runs can be diffed.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Allow running as `python scripts/bench.py` from the project root.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SHOWS = ["Lost", "Heroes", "Fringe", "The Wire", "Deadwood", "Justified", "Community", "Severance"]
+CAST_SIZE = 40
+# Actors are drawn from a shared pool so /compare finds overlaps.
+ACTOR_POOL = 120
+
+SUMMARY_TEXT = """## Personality & Traits
+- Stubborn
+- Loyal
+
+## Key Events
+- Crashed on the island
+- Led the survivors
+
+## Significant Relationships
+relationship_1:
+  name: "Kate"
+  role: "Ally"
+  description: "Trusted friend."
+
+## Importance to the Story
+Central to the plot.
+
+## Notable Quote
+"We have to go back."
+"""
+
+
+def _stable_id(text):
+    return zlib.crc32(text.encode()) % 90000 + 1000
+
+
+def _cast_for(show_id):
+    rng = random.Random(show_id)
+    actors = rng.sample(range(1, ACTOR_POOL + 1), CAST_SIZE)
+    return [{
+        "id": actor,
+        "name": f"Actor {actor}",
+        "profile_path": f"/actor{actor}.jpg",
+        "roles": [{"character": f"Character {actor}", "episode_count": CAST_SIZE * 2 - i}],
+    } for i, actor in enumerate(actors)]
+
+
+def _show_details(show_id, append):
+    details = {
+        "id": show_id,
+        "name": f"Show {show_id}",
+        "overview": "A show.",
+        "poster_path": f"/poster{show_id}.jpg",
+        "backdrop_path": f"/backdrop{show_id}.jpg",
+        "seasons": [{"season_number": n, "overview": f"Season {n}.", "poster_path": f"/s{show_id}_{n}.jpg"}
+                    for n in range(0, 6)],
+    }
+    if "aggregate_credits" in append:
+        details["aggregate_credits"] = {"cast": _cast_for(show_id)}
+    return details
+
+
+class StubServer:
+    """Threaded HTTP server that sleeps `latency` seconds before each answer and counts hits."""
+
+    def __init__(self, name, respond, latency):
+        self.name = name
+        self.latency = latency
+        self.hits = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                with stub._lock:
+                    stub.hits += 1
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                time.sleep(stub.latency)
+                status, payload, stream = respond(self.command, urlparse(self.path), body)
+                if stream is not None:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for event in stream:
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name=f"stub-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def tmdb_respond(method, url, body):
+    path = url.path.strip("/").split("/")[1:]  # drop the API version
+    query = parse_qs(url.query)
+    if path[:1] == ["search"]:
+        name = query.get("query", [""])[0]
+        key = "name" if path[1] == "tv" else "title"
+        return 200, {"results": [{
+            "id": _stable_id(f"{path[1]}:{name}"), key: name, "overview": "A show.",
+            "poster_path": "/poster.jpg", "backdrop_path": "/backdrop.jpg", "popularity": 10,
+        }]}, None
+    if path[:1] == ["tv"] and len(path) == 2:
+        return 200, _show_details(int(path[1]), query.get("append_to_response", [""])[0]), None
+    if path[:1] == ["tv"] and path[2:] == ["aggregate_credits"]:
+        return 200, {"cast": _cast_for(int(path[1]))}, None
+    if path[:1] == ["movie"] and path[2:] == ["credits"]:
+        cast = [{"id": p["id"], "name": p["name"], "profile_path": p["profile_path"],
+                 "character": p["roles"][0]["character"]} for p in _cast_for(int(path[1]))]
+        return 200, {"cast": cast}, None
+    if path[:1] == ["person"]:
+        return 200, {"cast": [{"title": f"Film {i}", "popularity": i} for i in range(5)], "crew": []}, None
+    return 404, {"status_message": "not stubbed"}, None
+
+
+def openai_respond(method, url, body):
+    usage = {"prompt_tokens": 600, "completion_tokens": 250, "total_tokens": 850}
+    model = body.get("model", "gpt-4")
+    if body.get("stream"):
+        words = SUMMARY_TEXT.split(" ")
+        events = [{"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": model,
+                   "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                  for word in words]
+        events.append({"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": model,
+                       "choices": [], "usage": usage})
+        return 200, None, events
+    return 200, {
+        "id": "bench", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": SUMMARY_TEXT}}],
+        "usage": usage,
+    }, None
+
+
+def sonarr_respond(method, url, body):
+    return 200, [{
+        "series": {"title": show}, "seasonNumber": 1, "episodeNumber": i + 1,
+        "title": f"Episode {i + 1}", "airDate": "2025-01-01", "airDateUtc": "2025-01-01T02:00:00Z",
+        "overview": "An episode.",
+    } for i, show in enumerate(SHOWS)], None
+
+
+def webhook_payload(i):
+    show = SHOWS[i % len(SHOWS)]
+    return {
+        "event": "media.play",
+        "Account": {"title": "woodsfehr"},
+        "Metadata": {"grandparentTitle": show, "parentIndex": 1 + i % 3, "index": 1 + i % 10},
+    }
+
+
+def scenarios():
+    """name -> function(client, i) issuing one request and returning the response."""
+    return {
+        "index": lambda c, i: c.get("/"),
+        "compare": lambda c, i: c.post("/compare", data={
+            "title1": SHOWS[i % len(SHOWS)], "title2": SHOWS[(i + 1) % len(SHOWS)]}),
+        "character_summary": lambda c, i: c.get("/character-summary", query_string={
+            "character": f"Character {i % 10 + 1}", "show": SHOWS[i % len(SHOWS)], "season": 1, "episode": 1}),
+        "autocomplete_shows": lambda c, i: c.get("/autocomplete/shows", query_string={
+            "q": SHOWS[i % len(SHOWS)][: 1 + i % 3]}),
+        "autocomplete_characters": lambda c, i: c.get("/autocomplete/characters", query_string={
+            "show": SHOWS[i % len(SHOWS)], "q": "char"}),
+        "plex_webhook": lambda c, i: c.post("/plex-webhook", json=webhook_payload(i)),
+        "calendar": lambda c, i: c.get("/calendar/full"),
+    }
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def parse_upstream_header(value):
+    counts = {}
+    for part in (value or "").split(","):
+        name, _, count = part.strip().partition("=")
+        if count.isdigit():
+            counts[name] = int(count)
+    return counts
+
+
+def run_scenario(app, name, issue, requests, concurrency):
+    latencies = []
+    statuses = {}
+    upstream = {}
+    lock = threading.Lock()
+
+    def worker(indexes):
+        client = app.test_client()
+        for i in indexes:
+            started = time.perf_counter()
+            response = issue(client, i)
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                for key, count in parse_upstream_header(response.headers.get("X-Upstream-Calls")).items():
+                    upstream[key] = upstream.get(key, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, [range(w, requests, concurrency) for w in range(concurrency)]))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 500),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(requests / wall, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "upstream_calls_per_request": {k: round(v / requests, 2) for k, v in sorted(upstream.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tmdb-latency-ms", type=float, default=40)
+    parser.add_argument("--openai-latency-ms", type=float, default=800)
+    parser.add_argument("--sonarr-latency-ms", type=float, default=20)
+    parser.add_argument("--scenario", action="append", help="run only these scenarios (repeatable)")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--verbose", action="store_true", help="keep the app's log output")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # The app print()s debug output from request and job threads; keep all of it
+    # off stdout so stdout carries nothing but the JSON report.
+    report_stream = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        output = run(args)
+        report_stream.write(output + "\n")
+        report_stream.flush()
+
+
+def run(args):
+    """Start the stubs and the app, run the selected scenarios and return the JSON report."""
+
+    stubs = {
+        "tmdb": StubServer("tmdb", tmdb_respond, args.tmdb_latency_ms / 1000).start(),
+        "openai": StubServer("openai", openai_respond, args.openai_latency_ms / 1000).start(),
+        "sonarr": StubServer("sonarr", sonarr_respond, args.sonarr_latency_ms / 1000).start(),
+    }
+    workdir = tempfile.mkdtemp(prefix="shownotes-bench-")
+
+    # Everything below reads its configuration at import time.
+    os.environ.update({
+        "TMDB_API_BASE": stubs["tmdb"].url + "/3",
+        "TMDB_API_KEY": "bench",
+        "OPENAI_BASE_URL": stubs["openai"].url + "/v1",
+        "OPENAI_API_KEY": "bench",
+        "SONARR_URL": stubs["sonarr"].url + "/api/v3/calendar",
+        "SHOWNOTES_DB_PATH": os.path.join(workdir, "shownotes.db"),
+        "METADATA_REFRESH_COALESCE_SECONDS": "0",
+        "SUMMARY_WARMUP_ENABLED": "0",
+    })
+    import logging
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    from app import create_app
+    from app.utils import populate_show_metadata
+
+    app = create_app()
+    with app.app_context():
+        for show in SHOWS:
+            populate_show_metadata(show, force=True)
+    app.test_client().post("/plex-webhook", json=webhook_payload(0))
+
+    selected = scenarios()
+    if args.scenario:
+        selected = {name: issue for name, issue in selected.items() if name in args.scenario}
+
+    results = {}
+    for name, issue in selected.items():
+        before = {stub_name: stub.hits for stub_name, stub in stubs.items()}
+        results[name] = run_scenario(app, name, issue, args.requests, args.concurrency)
+        results[name]["stub_hits"] = {stub_name: stub.hits - before[stub_name] for stub_name, stub in stubs.items()}
+        print(f"{name:>24}: {results[name]['throughput_rps']:8.1f} req/s  "
+              f"p50 {results[name]['p50_ms']:7.1f} ms  p95 {results[name]['p95_ms']:7.1f} ms  "
+              f"p99 {results[name]['p99_ms']:7.1f} ms", file=sys.stderr)
+
+    for stub in stubs.values():
+        stub.stop()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "tmdb_latency_ms": args.tmdb_latency_ms,
+            "openai_latency_ms": args.openai_latency_ms,
+            "sonarr_latency_ms": args.sonarr_latency_ms,
+            "seed": args.seed,
+            "python": sys.version.split()[0],
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return output
+
+
+if __name__ == "__main__":
+    main()
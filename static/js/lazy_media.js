@@ -0,0 +1,74 @@
+// Fills page placeholders from the /api/show/* JSON endpoints after load,
+// so pages render without waiting on TMDB.
+//
+//   [data-cast-media-url]   container; fills img.lazy-media[data-character][data-size]
+//                           and [data-actor-for] text inside it
+//   [data-backdrop-url]     element whose background becomes the show backdrop
+//   [data-characters-url]   list filled with links built from data-link-template,
+//                           where __CHARACTER__ is replaced by each name
+
+async function fetchFragment(url) {
+  try {
+    const response = await fetch(url);
+    return response.ok ? await response.json() : null;
+  } catch (err) {
+    console.error("Fragment fetch error:", url, err);
+    return null;
+  }
+}
+
+async function loadCastMedia(container) {
+  const pending = container.querySelectorAll("img.lazy-media[data-character]");
+  const actors = container.querySelectorAll("[data-actor-for]");
+  if (!pending.length && !actors.length) return;
+
+  const data = await fetchFragment(container.dataset.castMediaUrl);
+  if (!data) return;
+  pending.forEach((img) => {
+    const entry = data.characters[img.dataset.character];
+    const url = entry && entry.images[img.dataset.size];
+    if (url) {
+      img.src = url;
+      img.classList.remove("lazy-media");
+    } else {
+      img.remove();
+    }
+  });
+  actors.forEach((el) => {
+    const entry = data.characters[el.dataset.actorFor];
+    if (entry && entry.actor) {
+      el.querySelector("[data-actor-name]").textContent = entry.actor;
+      el.hidden = false;
+    }
+  });
+}
+
+async function loadBackdrop(el) {
+  const data = await fetchFragment(el.dataset.backdropUrl);
+  if (data && data.backdrop_url) {
+    el.style.backgroundImage = `url('${data.backdrop_url}')`;
+  }
+}
+
+async function loadCharacters(list) {
+  const data = await fetchFragment(list.dataset.charactersUrl);
+  const exclude = list.dataset.exclude || "";
+  const names = data ? data.characters.filter((name) => name !== exclude) : [];
+  names.forEach((name) => {
+    const item = document.createElement("li");
+    item.className = "list-group-item";
+    const link = document.createElement("a");
+    link.href = list.dataset.linkTemplate.replace("__CHARACTER__", encodeURIComponent(name));
+    link.textContent = name;
+    item.appendChild(link);
+    list.appendChild(item);
+  });
+  const card = list.closest("[data-lazy-card]");
+  if (card) card.hidden = names.length === 0;
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("[data-cast-media-url]").forEach(loadCastMedia);
+  document.querySelectorAll("[data-backdrop-url]").forEach(loadBackdrop);
+  document.querySelectorAll("[data-characters-url]").forEach(loadCharacters);
+});